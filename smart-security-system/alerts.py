@@ -0,0 +1,101 @@
+"""
+Alert Coalescing
+Groups bursts of detections of the same person into one incident so each incident sends a single email
+"""
+
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class AlertCoalescer:
+    def __init__(self, window=30):
+        """
+        Collects detection events per (source, person type, person name) into incidents
+        
+        Args:
+            window: Seconds an incident stays open after its first event; 0 sends every event on its own
+        """
+        self.window = window
+        self.incidents = OrderedDict()  # key -> open incident, oldest first
+        self.lock = threading.Lock()
+    
+    def add(self, key, event, now=None):
+        """
+        Add a detection event to the open incident for key (opening one if needed)
+        
+        Args:
+            key: Grouping key, e.g. (source, person_type, person_name)
+            event: Dict describing the detection (timestamp, confidence, evidence, ...)
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            incident = self.incidents.get(key)
+            if incident is None:
+                incident = {'key': key, 'opened': now, 'events': []}
+                self.incidents[key] = incident
+            incident['events'].append(event)
+    
+    def pop_due(self, now=None):
+        """Remove and return the incidents whose window has closed, oldest first"""
+        now = time.time() if now is None else now
+        with self.lock:
+            due = [key for key, incident in self.incidents.items() if now - incident['opened'] >= self.window]
+            return [self.incidents.pop(key) for key in due]
+    
+    def pop_all(self):
+        """Remove and return every open incident (used on shutdown)"""
+        with self.lock:
+            incidents = list(self.incidents.values())
+            self.incidents.clear()
+            return incidents
+    
+    def __len__(self):
+        return len(self.incidents)
+
+def incident_evidence(incident, max_thumbnails=8):
+    """
+    Pick the evidence for one incident email
+    
+    Returns:
+        Dict with the first clip and summary, the first photo, and up to max_thumbnails photo paths
+        spread evenly over the incident (for the thumbnail strip)
+    """
+    evidence = {'photo_path': None, 'video_path': None, 'summary_path': None, 'thumbnail_paths': []}
+    photos = []
+    for event in incident['events']:
+        event_evidence = event.get('evidence') or {}
+        for field in ('photo_path', 'video_path', 'summary_path'):
+            if evidence[field] is None and event_evidence.get(field):
+                evidence[field] = event_evidence[field]
+        if event_evidence.get('photo_path'):
+            photos.append(event_evidence['photo_path'])
+    
+    if len(photos) > max_thumbnails:
+        picks = np.linspace(0, len(photos) - 1, max_thumbnails).round().astype(int)
+        photos = [photos[i] for i in picks]
+    evidence['thumbnail_paths'] = photos
+    return evidence
+
+def build_thumbnail_strip(paths, height=120, quality=80):
+    """
+    Load detection photos and join them side by side into one JPEG
+    
+    Returns:
+        JPEG bytes, or None if none of the photos could be read
+    """
+    import cv2  # Only needed once an email is built; listener-only daemons never load it
+    
+    thumbnails = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        width = max(1, int(image.shape[1] * height / image.shape[0]))
+        thumbnails.append(cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA))
+    
+    if not thumbnails:
+        return None
+    
+    ok, encoded = cv2.imencode('.jpg', cv2.hconcat(thumbnails), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes() if ok else None
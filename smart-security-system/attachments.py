@@ -0,0 +1,142 @@
+"""
+Email Attachments
+Chunked base64 attachment encoding, a per-message size budget, and compact preview clips for large videos
+"""
+
+import os
+import base64
+import pathlib
+from email.mime.base import MIMEBase
+
+LINE_BYTES = 57  # 57 raw bytes -> one 76 character base64 line
+CHUNK_BYTES = LINE_BYTES * 1024
+
+def encoded_size(nbytes):
+    """Size of nbytes once base64-encoded with 76 character lines"""
+    lines = (nbytes + LINE_BYTES - 1) // LINE_BYTES
+    return lines * 78  # 76 characters + CRLF
+
+def encode_file_base64(path, chunk_bytes=CHUNK_BYTES):
+    """
+    Base64-encode a file chunk by chunk into 76 character lines
+    
+    The raw file is never held in memory as a whole. The encoded chunks are joined once at the end,
+    so the peak is about twice the encoded size (the chunks plus the joined text) for that moment.
+    """
+    chunk_bytes -= chunk_bytes % LINE_BYTES  # Whole lines per chunk, so chunks can simply be concatenated
+    chunks = []
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                break
+            chunks.append(base64.encodebytes(chunk).decode('ascii'))
+    return ''.join(chunks)
+
+def file_attachment(path, maintype='application', subtype='octet-stream', filename=None):
+    """Build a base64 MIME attachment for a file using the chunked encoder"""
+    part = MIMEBase(maintype, subtype)
+    part.set_payload(encode_file_base64(path))
+    part['Content-Transfer-Encoding'] = 'base64'
+    part.add_header('Content-Disposition', 'attachment', filename=filename or os.path.basename(path))
+    return part
+
+def local_file_link(path):
+    """HTML link to a file kept on the security system (for evidence too large to attach)"""
+    absolute = os.path.abspath(path)
+    return f'<a href="{pathlib.Path(absolute).as_uri()}">{absolute}</a>'
+
+class AttachmentBudget:
+    def __init__(self, max_bytes):
+        """
+        Tracks how much of a message's size limit the attachments have used
+        
+        Args:
+            max_bytes: Limit for all encoded attachments of one message
+        """
+        self.max_bytes = max_bytes
+        self.used = 0
+    
+    def remaining(self):
+        return max(0, self.max_bytes - self.used)
+    
+    def fits(self, nbytes):
+        """True if a file of nbytes still fits once encoded"""
+        return encoded_size(nbytes) <= self.remaining()
+    
+    def take(self, nbytes):
+        """Reserve room for a file of nbytes; returns False (reserving nothing) if it does not fit"""
+        if not self.fits(nbytes):
+            return False
+        self.used += encoded_size(nbytes)
+        return True
+
+def make_preview_clip(video_path, preview_path, max_bytes, width=320, fps=5, attempts=3):
+    """
+    Transcode a clip to a smaller, lower-rate preview that fits in max_bytes
+    
+    Each attempt that comes out too large halves the width and frame rate again.
+    
+    Returns:
+        The preview path, or None if no preview small enough could be made
+    """
+    import cv2  # Only needed for clips too large to attach
+    
+    for _ in range(attempts):
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            return None
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or fps
+        step = max(1, int(round(source_fps / fps)))
+        
+        writer = None
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index % step == 0:
+                height = max(2, int(frame.shape[0] * width / frame.shape[1]) // 2 * 2)
+                small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                if writer is None:
+                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                    writer = cv2.VideoWriter(preview_path, fourcc, source_fps / step, (width, height))
+                writer.write(small)
+            index += 1
+        capture.release()
+        
+        if writer is None:
+            return None
+        writer.release()
+        
+        if encoded_size(os.path.getsize(preview_path)) <= max_bytes:
+            return preview_path
+        
+        width = max(80, width // 2)
+        fps = max(1, fps / 2)
+    
+    os.remove(preview_path)
+    return None
+
+def prepare_clip_attachment(video_path, budget, preview_dir=None):
+    """
+    Decide how a clip goes into an email within the remaining budget
+    
+    Returns:
+        (path to attach or None, True if that path is a preview rather than the original)
+    """
+    if not video_path or not os.path.exists(video_path):
+        return None, False
+    
+    size = os.path.getsize(video_path)
+    if budget.take(size):
+        return video_path, False
+    
+    preview_dir = preview_dir or os.path.join(os.path.dirname(video_path), "previews")
+    os.makedirs(preview_dir, exist_ok=True)
+    name, _ = os.path.splitext(os.path.basename(video_path))
+    preview_path = make_preview_clip(video_path, os.path.join(preview_dir, f"{name}_preview.mp4"), budget.remaining())
+    if preview_path and budget.take(os.path.getsize(preview_path)):
+        print(f"🎞️ Clip too large to attach ({size/1024/1024:.1f}MB), attaching preview")
+        return preview_path, True
+    return None, False
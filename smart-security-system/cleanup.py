@@ -1,6 +1,6 @@
 import os, shutil
-dirs = ['authorized_faces', 'security_clips', 'security_photos', 'security_logs']
-files = ['detection_logs.json']
+dirs = ['authorized_faces', 'security_clips', 'security_photos', 'security_logs', 'detection_log_archive']
+files = ['detection_logs.json', 'detection_logs.json.imported', 'detection_logs.db', 'detection_logs.db-wal', 'detection_logs.db-shm']
 for d in dirs:
     if os.path.exists(d):
         shutil.rmtree(d)
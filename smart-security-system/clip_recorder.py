@@ -0,0 +1,146 @@
+"""
+Clip Recorder
+Records detection clips in the background: pre-roll from the frame buffer, then live post-roll frames
+"""
+
+import os
+import time
+import threading
+import cv2
+
+class ClipRecorder:
+    def __init__(self, frame_buffer, fallback_fps=15, max_clip_seconds=60):
+        """
+        Background recorder that follows a FrameRingBuffer
+        
+        Args:
+            frame_buffer: FrameRingBuffer that capture writes into
+            fallback_fps: Recording rate used when the capture rate cannot be measured yet
+            max_clip_seconds: Upper bound on a clip extended by repeated triggers
+        """
+        self.frame_buffer = frame_buffer
+        self.fallback_fps = fallback_fps
+        self.max_clip_seconds = max_clip_seconds
+        self.active = None
+        self.threads = []
+        self.lock = threading.Lock()
+    
+    def trigger(self, path, post_roll_seconds, overlay_frame=None, on_finished=None):
+        """
+        Start a clip, or extend the clip already being recorded
+        
+        Args:
+            path: Output file for a new clip (ignored when an active clip is extended)
+            post_roll_seconds: How long to keep recording live frames after this trigger
+            overlay_frame: Highlighted detection frame inserted at the trigger point
+            on_finished: Called from the recorder thread with the clip info once the file is closed
+        
+        Returns:
+            Path of the clip this trigger was recorded into
+        """
+        now = time.time()
+        first, trigger_sequence = self.frame_buffer.sequence_range()
+        
+        with self.lock:
+            clip = self.active
+            if clip is None:
+                clip = {
+                    'path': path,
+                    'started': now,
+                    'deadline': now + post_roll_seconds,
+                    'first_sequence': first,
+                    'fps': float(self.frame_buffer.measured_fps() or self.fallback_fps),
+                    'overlays': {},
+                    'callbacks': [],
+                    'triggers': 0
+                }
+                self.active = clip
+                thread = threading.Thread(target=self.record, args=(clip,), daemon=True)
+                self.threads = [t for t in self.threads if t.is_alive()] + [thread]
+                thread.start()
+            else:
+                # Overlapping detection: keep recording the same clip a little longer
+                clip['deadline'] = min(max(clip['deadline'], now + post_roll_seconds),
+                                       clip['started'] + self.max_clip_seconds)
+            
+            clip['triggers'] += 1
+            if overlay_frame is not None:
+                clip['overlays'].setdefault(trigger_sequence, []).append(overlay_frame)
+            if on_finished is not None:
+                clip['callbacks'].append(on_finished)
+            return clip['path']
+    
+    def record(self, clip):
+        """Recorder thread: write buffered and then live frames until the clip deadline passes"""
+        writer = None
+        next_sequence = clip['first_sequence']
+        frames_written = 0
+        
+        try:
+            while True:
+                with self.lock:
+                    deadline = clip['deadline']
+                    finishing = time.time() >= deadline
+                    if finishing:
+                        # Later triggers start a new clip from here on
+                        self.active = None
+                
+                safe_first, end = self.frame_buffer.sequence_range()
+                if next_sequence < safe_first:
+                    print(f"Clip recorder skipped {safe_first - next_sequence} frames")
+                    next_sequence = safe_first
+                
+                for frame, timestamp in self.frame_buffer.iter_frames(next_sequence, end):
+                    if timestamp > deadline:
+                        break
+                    
+                    if writer is None:
+                        height, width = frame.shape[:2]
+                        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                        writer = cv2.VideoWriter(clip['path'], fourcc, clip['fps'], (width, height))
+                    
+                    for overlay in clip['overlays'].get(next_sequence, []):
+                        writer.write(overlay)
+                        frames_written += 1
+                    writer.write(frame)
+                    frames_written += 1
+                    next_sequence += 1
+                
+                if finishing:
+                    break
+                time.sleep(0.02)
+        
+        except Exception as e:
+            print(f"❌ Error recording video clip: {e}")
+        
+        finally:
+            if writer is not None:
+                writer.release()
+        
+        info = None
+        if frames_written and os.path.exists(clip['path']):
+            file_size = os.path.getsize(clip['path'])
+            info = {
+                'filename': os.path.basename(clip['path']),
+                'path': clip['path'],
+                'duration_seconds': frames_written / clip['fps'],
+                'fps': clip['fps'],
+                'file_size_mb': file_size / 1024 / 1024,
+                'frame_count': frames_written,
+                'triggers': clip['triggers']
+            }
+            print(f"✅ Video clip created: {frames_written} frames, {file_size/1024/1024:.1f}MB")
+        
+        for callback in clip['callbacks']:
+            try:
+                callback(info)
+            except Exception as e:
+                print(f"Error in clip callback: {e}")
+    
+    def stop(self, timeout=5):
+        """End the active clip now and wait for the file to be finalized"""
+        with self.lock:
+            if self.active is not None:
+                self.active['deadline'] = time.time()
+        for thread in self.threads:
+            thread.join(timeout)
@@ -0,0 +1,188 @@
+"""
+Detection Backends
+Run face_recognition detection either in the calling thread or on a pool of worker processes
+"""
+
+import os
+import time
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import cv2
+
+# Worker process state, set up once per process by _init_worker
+_worker_slots = []
+
+def _init_worker(slot_names, shape):
+    """Attach to the shared frame slots and load the face models once per worker process"""
+    global _worker_slots, face_recognition
+    import face_recognition
+    
+    _worker_slots = []
+    for name in slot_names:
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_slots.append((shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)))
+
+def _detect_in_worker(slot):
+    """Detect and encode faces in a shared frame slot; only the small results are pickled back"""
+    frame = _worker_slots[slot][1]
+    locations = face_recognition.face_locations(frame)
+    encodings = face_recognition.face_encodings(frame, locations)
+    return locations, [np.asarray(encoding, dtype=np.float32) for encoding in encodings]
+
+def prepare_frame(frame, scale):
+    """Downscale a BGR frame and convert it to RGB for face_recognition"""
+    small = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+class LocalDetectionBackend:
+    def __init__(self, scale=0.25):
+        """Detect faces synchronously in the calling thread"""
+        import face_recognition
+        self.face_recognition = face_recognition
+        self.scale = scale
+        self.completed = []
+        self.dropped = 0
+    
+    def submit(self, frame, timestamp):
+        """Detect faces in a frame; the result is returned by the next collect()"""
+        rgb_small_frame = prepare_frame(frame, self.scale)
+        locations = self.face_recognition.face_locations(rgb_small_frame)
+        encodings = self.face_recognition.face_encodings(rgb_small_frame, locations)
+        self.completed.append((timestamp, frame, locations, encodings))
+        return True
+    
+    def in_flight(self):
+        return 0
+    
+    def collect(self, timeout=0):
+        """Return finished (timestamp, frame, face locations, face encodings) results in frame order"""
+        completed, self.completed = self.completed, []
+        return completed
+    
+    def close(self):
+        pass
+
+class ProcessPoolDetectionBackend:
+    def __init__(self, workers=None, scale=0.25, slots_per_worker=2):
+        """
+        Detect faces on a pool of worker processes using shared-memory frame buffers
+        
+        Args:
+            workers: Number of worker processes (default: CPU count - 1)
+            scale: Downscale factor applied before detection
+            slots_per_worker: Shared frame buffers per worker, bounding the frames in flight
+        """
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.scale = scale
+        self.slot_count = self.workers * slots_per_worker
+        
+        # Slots and pool are created on the first frame, once the frame size is known
+        self.shape = None
+        self.slots = []
+        self.slot_arrays = []
+        self.free_slots = queue.Queue()
+        self.pool = None
+        
+        self.pending = {}  # sequence number -> (async result, slot, timestamp, full-size frame)
+        self.next_sequence = 0
+        self.next_output = 0
+        self.dropped = 0
+    
+    def start(self, shape):
+        """Allocate the shared frame slots and start the worker pool"""
+        self.shape = shape
+        nbytes = int(np.prod(shape))
+        for index in range(self.slot_count):
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self.slots.append(shm)
+            self.slot_arrays.append(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+            self.free_slots.put(index)
+        
+        # Spawn avoids forking a process that is running Tk and capture threads
+        context = multiprocessing.get_context('spawn')
+        self.pool = context.Pool(self.workers, initializer=_init_worker,
+                                 initargs=([shm.name for shm in self.slots], shape))
+        print(f"Detection pool started with {self.workers} workers")
+    
+    def submit(self, frame, timestamp):
+        """
+        Copy a downscaled frame into a free shared slot and queue it for detection
+        
+        Returns:
+            False if every slot is busy and the frame was dropped
+        """
+        if self.pool is None:
+            height, width = frame.shape[:2]
+            self.start((int(round(height * self.scale)), int(round(width * self.scale)), 3))
+        
+        try:
+            slot = self.free_slots.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        
+        small = cv2.resize(frame, (self.shape[1], self.shape[0]))
+        cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.slot_arrays[slot])
+        
+        result = self.pool.apply_async(_detect_in_worker, (slot,))
+        # The full-size frame is kept for the evidence; capture never modifies a frame once it is published
+        self.pending[self.next_sequence] = (result, slot, timestamp, frame)
+        self.next_sequence += 1
+        return True
+    
+    def in_flight(self):
+        return len(self.pending)
+    
+    def collect(self, timeout=0):
+        """
+        Return finished (timestamp, frame, face locations, face encodings) results in frame order
+        
+        Waits up to timeout for the oldest pending frame; later frames that finish first are
+        held back until everything before them is done.
+        """
+        completed = []
+        deadline = time.time() + timeout
+        
+        while self.next_output in self.pending:
+            result, slot, timestamp, frame = self.pending[self.next_output]
+            if not result.ready():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                result.wait(remaining)
+                if not result.ready():
+                    break
+            
+            del self.pending[self.next_output]
+            self.next_output += 1
+            self.free_slots.put(slot)
+            
+            try:
+                locations, encodings = result.get()
+                completed.append((timestamp, frame, locations, encodings))
+            except Exception as e:
+                print(f"Detection worker error: {e}")
+        
+        return completed
+    
+    def close(self):
+        """Stop the workers and release the shared frame slots"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        
+        self.slot_arrays = []
+        for shm in self.slots:
+            shm.close()
+            shm.unlink()
+        self.slots = []
+        self.pending = {}
+
+def create_detection_backend(workers, scale=0.25):
+    """Return an in-thread backend for workers == 0, otherwise a process pool backend"""
+    if workers <= 0:
+        return LocalDetectionBackend(scale)
+    return ProcessPoolDetectionBackend(workers, scale)
@@ -0,0 +1,238 @@
+"""
+Detection History Queries
+Filters stored detection records and computes vectorized aggregates, with a command-line report
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from log_store import SQLiteLogStore, JsonlLogStore
+
+def load_records(backend="sqlite", path=None, archive_dir="detection_log_archive", start=None, end=None, **filters):
+    """
+    Read matching records from the live detection log and its archive (without rotating anything)
+    
+    Args:
+        backend: "sqlite" or "jsonl"
+        path: Log file (default: detection_logs.db / detection_logs.json)
+        archive_dir: Directory of rotated log segments (None or missing = live log only)
+        start, end: Timestamp strings bounding the query ("YYYY-MM-DD[ HH:MM:SS]")
+        filters: source, person_type, person_name
+    
+    Returns:
+        List of record dicts, oldest first (FileNotFoundError if neither the log nor the archive exists)
+    """
+    if backend == "jsonl":
+        path = path or "detection_logs.json"
+    else:
+        path = path or "detection_logs.db"
+    has_archive = bool(archive_dir) and os.path.exists(os.path.join(archive_dir, "index.json"))
+    # Opening a store creates a missing file; a read-only report must not leave an empty log behind
+    if not os.path.exists(path) and not has_archive:
+        raise FileNotFoundError(f"No detection log at {path}")
+    
+    records = []
+    if has_archive:
+        from log_archive import LogArchive
+        records = LogArchive(archive_dir).query(start, end, **filters)
+    if os.path.exists(path):
+        store = JsonlLogStore(path) if backend == "jsonl" else SQLiteLogStore(path, import_from=None)
+        try:
+            records += store.query(start, end, **filters)
+        finally:
+            store.close()
+    return records
+
+class DetectionHistory:
+    def __init__(self, records):
+        """
+        Column arrays over a list of detection records
+        
+        Args:
+            records: Detection record dicts (timestamp, person_type, person_name, confidence, source)
+        """
+        self.records = records
+        self.timestamps = parse_timestamps([record.get('timestamp') for record in records])
+        self.confidence = np.array([record.get('confidence') if record.get('confidence') is not None else np.nan
+                                    for record in records], dtype=np.float64)
+        self.source = np.array([record.get('source') or "unknown" for record in records], dtype=object)
+        self.person_type = np.array([record.get('person_type') or "unknown" for record in records], dtype=object)
+        self.person_name = np.array([record.get('person_name') or "Unknown" for record in records], dtype=object)
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def select(self, mask):
+        """New history holding the records where mask is True"""
+        return DetectionHistory([record for record, keep in zip(self.records, mask) if keep])
+    
+    def filter(self, start=None, end=None, source=None, person_type=None, person_name=None):
+        """Filter by time range (inclusive) and field values"""
+        mask = ~np.isnat(self.timestamps)
+        if start is not None:
+            mask &= self.timestamps >= np.datetime64(start)
+        if end is not None:
+            mask &= self.timestamps <= np.datetime64(end)
+        for column, value in ((self.source, source), (self.person_type, person_type), (self.person_name, person_name)):
+            if value:
+                mask &= column == value
+        return self.select(mask)
+    
+    def mean_confidence(self):
+        """Mean confidence over records that have one (NaN if none do)"""
+        valid = ~np.isnan(self.confidence)
+        return float(self.confidence[valid].mean()) if valid.any() else float('nan')
+    
+    def per_hour(self):
+        """
+        Detections per calendar hour, including hours with none
+        
+        Returns:
+            (array of datetime64[h] hour starts, array of counts)
+        """
+        hours = self.timestamps[~np.isnat(self.timestamps)].astype('datetime64[h]')
+        if hours.size == 0:
+            return np.array([], dtype='datetime64[h]'), np.array([], dtype=np.int64)
+        first = hours.min()
+        counts = np.bincount((hours - first).astype(np.int64))
+        return first + np.arange(counts.size), counts
+    
+    def hour_of_day(self):
+        """Detections per hour of the day (24 counts, 0 = midnight)"""
+        hours = self.timestamps[~np.isnat(self.timestamps)]
+        hour = (hours - hours.astype('datetime64[D]')).astype('timedelta64[h]').astype(np.int64)
+        return np.bincount(hour, minlength=24)
+    
+    def per_identity(self):
+        """
+        Detection count and mean confidence per (person type, person name)
+        
+        Returns:
+            List of dicts sorted by count (most detections first)
+        """
+        if len(self) == 0:
+            return []
+        keys = np.array([f"{person_type}\0{name}" for person_type, name in zip(self.person_type, self.person_name)])
+        identities, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse)
+        
+        valid = ~np.isnan(self.confidence)
+        confidence_sum = np.bincount(inverse[valid], weights=self.confidence[valid], minlength=identities.size)
+        confidence_count = np.bincount(inverse[valid], minlength=identities.size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_confidence = confidence_sum / confidence_count
+        
+        results = []
+        for index in np.argsort(-counts, kind='stable'):
+            person_type, name = identities[index].split("\0", 1)
+            results.append({
+                'person_type': person_type,
+                'person_name': name,
+                'count': int(counts[index]),
+                'mean_confidence': float(mean_confidence[index])
+            })
+        return results
+    
+    def per_source(self):
+        """Detection counts per source"""
+        sources, counts = np.unique(self.source.astype(str), return_counts=True)
+        return {str(source): int(count) for source, count in zip(sources, counts)}
+    
+    def summary(self):
+        """Totals, time span, mean confidence and per-source/per-identity breakdowns"""
+        valid = self.timestamps[~np.isnat(self.timestamps)]
+        return {
+            'total': len(self),
+            'first': str(valid.min()).replace('T', ' ') if valid.size else None,
+            'last': str(valid.max()).replace('T', ' ') if valid.size else None,
+            'mean_confidence': self.mean_confidence(),
+            'per_source': self.per_source(),
+            'per_identity': self.per_identity()
+        }
+
+def parse_timestamps(values):
+    """Parse "YYYY-MM-DD HH:MM:SS" strings into datetime64[s]; unparseable values become NaT"""
+    try:
+        return np.array([value or 'NaT' for value in values], dtype='datetime64[s]')
+    except ValueError:
+        parsed = np.empty(len(values), dtype='datetime64[s]')
+        for index, value in enumerate(values):
+            try:
+                parsed[index] = np.datetime64(value or 'NaT', 's')
+            except ValueError:
+                parsed[index] = np.datetime64('NaT')
+        return parsed
+
+def nan_to_none(value):
+    return None if value != value else value
+
+def print_report(history, group_by):
+    summary = history.summary()
+    print(f"Detections: {summary['total']}")
+    if summary['total'] == 0:
+        return
+    print(f"From {summary['first']} to {summary['last']}")
+    print(f"Mean confidence: {summary['mean_confidence']:.3f}")
+    print("By source: " + ", ".join(f"{source} {count}" for source, count in summary['per_source'].items()))
+    
+    if group_by == "identity":
+        print(f"\n{'Type':<14}{'Name':<24}{'Count':>8}{'Mean conf':>11}")
+        for row in summary['per_identity']:
+            print(f"{row['person_type']:<14}{row['person_name']:<24}{row['count']:>8}{row['mean_confidence']:>11.3f}")
+    elif group_by == "hour":
+        hours, counts = history.per_hour()
+        print(f"\n{'Hour':<18}{'Count':>8}")
+        for hour, count in zip(hours, counts):
+            if count:
+                print(f"{str(hour).replace('T', ' ')}:00{count:>8}")
+    elif group_by == "hour-of-day":
+        counts = history.hour_of_day()
+        peak = max(1, counts.max())
+        print(f"\n{'Hour':<6}{'Count':>8}")
+        for hour, count in enumerate(counts):
+            print(f"{hour:02d}:00{count:>8}  {'#' * int(round(40 * count / peak))}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Query and summarize the detection history')
+    parser.add_argument('--backend', choices=('sqlite', 'jsonl'), default='sqlite', help='Log backend (default: sqlite)')
+    parser.add_argument('--log', default=None, help='Log file (default: detection_logs.db or detection_logs.json)')
+    parser.add_argument('--archive', default='detection_log_archive', help='Archive directory (default: detection_log_archive)')
+    parser.add_argument('--start', default=None, help='Earliest timestamp, e.g. "2024-05-01" or "2024-05-01 08:00:00"')
+    parser.add_argument('--end', default=None, help='Latest timestamp (inclusive)')
+    parser.add_argument('--source', default=None, help='Only this source (webcam, jetson, ...)')
+    parser.add_argument('--type', dest='person_type', choices=('authorized', 'unauthorized'), default=None, help='Only this person type')
+    parser.add_argument('--name', dest='person_name', default=None, help='Only this person name')
+    parser.add_argument('--by', choices=('identity', 'hour', 'hour-of-day'), default='identity', help='Breakdown to print (default: identity)')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    
+    args = parser.parse_args()
+    
+    # A date-only end bound covers the whole day
+    end = args.end + " 23:59:59" if args.end and len(args.end) == 10 else args.end
+    try:
+        records = load_records(args.backend, args.log, args.archive, args.start, end,
+                               source=args.source, person_type=args.person_type, person_name=args.person_name)
+    except FileNotFoundError as e:
+        print(f"Could not read detection history: {e}")
+        return 1
+    history = DetectionHistory(records)
+    
+    if args.json:
+        summary = history.summary()
+        hours, counts = history.per_hour()
+        summary['per_hour'] = {str(hour).replace('T', ' ') + ":00": int(count) for hour, count in zip(hours, counts) if count}
+        summary['hour_of_day'] = history.hour_of_day().tolist()
+        # Means over no confidences are NaN, which is not valid JSON
+        summary['mean_confidence'] = nan_to_none(summary['mean_confidence'])
+        for row in summary['per_identity']:
+            row['mean_confidence'] = nan_to_none(row['mean_confidence'])
+        json.dump(summary, sys.stdout, indent=2, allow_nan=False)
+        print()
+    else:
+        print_report(history, args.by)
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
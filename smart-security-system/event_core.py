@@ -0,0 +1,489 @@
+"""
+Event Processing Core
+Headless detection event processor: logging, incidents, alert coalescing and email run on their own thread
+"""
+
+import os
+import queue
+import threading
+from datetime import datetime
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from email.mime.image import MIMEImage
+from alerts import incident_evidence, build_thumbnail_strip
+from attachments import AttachmentBudget, file_attachment, prepare_clip_attachment, local_file_link
+
+def detection_count(message_type, data):
+    """Detections carried by a queued message (counted against the queue limit)"""
+    if message_type == 'detection':
+        return 1
+    if message_type == 'detection_batch':
+        return len(data)
+    return 0
+
+class EventProcessor:
+    def __init__(self, log_writer, email_dispatcher, alert_coalescer, recent_incidents, attachment_limit_mb=20,
+                 maxsize=1000, tick=0.25):
+        """
+        Processes detection events off the GUI thread and publishes render-ready updates
+        
+        Messages are (type, data) tuples: 'detection', 'detection_batch' (list of detections) and
+        'evidence_ready' (posted by the EvidenceWriter). Subscribers receive ('detection_view', view) for each
+        detection and ('status', text) for notification progress; they must not block.
+        
+        Args:
+            log_writer: BufferedLogWriter for the detection log
+            email_dispatcher: EmailDispatcher that sends the alert emails
+            alert_coalescer: AlertCoalescer grouping detections into incidents
+            recent_incidents: RecentIncidents holding evidence paths by incident id
+            attachment_limit_mb: Encoded attachment budget per email
+            maxsize: Queued detections (batches count every item) before submit() refuses more (the ingest
+                     server then answers 503)
+            tick: Seconds between checks for incidents whose coalescing window has closed
+        """
+        self.log_writer = log_writer
+        self.email_dispatcher = email_dispatcher
+        self.alert_coalescer = alert_coalescer
+        self.recent_incidents = recent_incidents
+        self.attachment_limit_mb = attachment_limit_mb
+        self.tick = tick
+        
+        self.events = queue.Queue()  # Detections are limited by count in submit(), not by queue entries
+        self.max_pending = maxsize
+        self.pending_detections = 0
+        self.pending_lock = threading.Lock()
+        self.subscribers = []
+        self.settings = {
+            'notify_authorized': False,
+            'notify_unauthorized': True,
+            'email': None  # SMTP server, port, sender, password and recipient
+        }
+        self.processed = 0
+        self.dropped = 0
+        self.thread = None
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+    
+    def subscribe(self, callback):
+        """Register callback(update_type, data); it is called on the processing thread"""
+        self.subscribers.append(callback)
+    
+    def publish(self, update_type, data):
+        for callback in self.subscribers:
+            try:
+                callback(update_type, data)
+            except Exception as e:
+                print(f"Error in event subscriber: {e}")
+    
+    def update_settings(self, **settings):
+        """Replace notification settings (notify_authorized, notify_unauthorized, email)"""
+        self.settings = dict(self.settings, **settings)
+    
+    def submit(self, message_type, data, block=False):
+        """
+        Queue a message for processing
+        
+        Args:
+            block: Queue the message even over the detection limit (for messages that must not be lost)
+        
+        Returns:
+            False if the detections would exceed the limit (and block is False)
+        """
+        count = detection_count(message_type, data)
+        with self.pending_lock:
+            if count and not block and self.pending_detections + count > self.max_pending:
+                self.dropped += count
+                return False
+            self.pending_detections += count
+        self.events.put((message_type, data))
+        return True
+    
+    def submit_batch(self, detections):
+        """
+        Queue as many detections of a batch as the limit allows, in order
+        
+        Returns:
+            Number of leading detections that were queued
+        """
+        with self.pending_lock:
+            accepted = detections[:max(0, self.max_pending - self.pending_detections)]
+            self.pending_detections += len(accepted)
+            self.dropped += len(detections) - len(accepted)
+        if accepted:
+            self.events.put(('detection_batch', accepted))
+        return len(accepted)
+    
+    def saturated(self):
+        return self.pending_detections >= self.max_pending
+    
+    def run(self):
+        while True:
+            try:
+                message_type, data = self.events.get(timeout=self.tick)
+            except queue.Empty:
+                message_type, data = None, None
+            
+            if message_type == 'stop':
+                break
+            if message_type is not None:
+                self.dispatch(message_type, data)
+            
+            # Email incidents whose coalescing window has closed
+            self.flush_alerts()
+        
+        # Finish what was queued before the stop, then send the incidents that are still open
+        while True:
+            try:
+                message_type, data = self.events.get_nowait()
+            except queue.Empty:
+                break
+            self.dispatch(message_type, data)
+        self.flush_alerts(self.alert_coalescer.pop_all())
+    
+    def dispatch(self, message_type, data):
+        try:
+            if message_type == 'detection':
+                self.handle_detection(data)
+            elif message_type == 'detection_batch':
+                for detection in data:
+                    self.handle_detection(detection)
+            elif message_type == 'evidence_ready':
+                self.handle_evidence(data)
+        except Exception as e:
+            print(f"Error processing {message_type}: {e}")
+        finally:
+            count = detection_count(message_type, data)
+            if count:
+                with self.pending_lock:
+                    self.pending_detections -= count
+    
+    def stop(self, timeout=10):
+        """Process everything queued, send open incidents and stop the thread"""
+        if self.thread is None:
+            return
+        self.events.put(('stop', None))
+        self.thread.join(timeout)
+        self.thread = None
+    
+    def handle_detection(self, data):
+        """Handle detection event from Jetson Nano or webcam"""
+        timestamp = data.get('timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        person_type = data.get('person_type') or 'unknown'
+        person_name = data.get('person_name', 'Unknown Person')
+        confidence = data.get('confidence')  # Stored as missing (NULL), not 0, so averages are not skewed
+        source = data.get('source', 'unknown')
+        self.processed += 1
+        
+        # Render-ready line for the logs view
+        source_label = "WEBCAM" if source == 'webcam' else "JETSON"
+        shown_confidence = confidence if confidence is not None else 0
+        if source == 'webcam':
+            log_entry = f"[{timestamp}] [{source_label}] {person_type.title()}: {person_name} (confidence: {shown_confidence:.2f})"
+        else:
+            log_entry = f"[{timestamp}] [{source_label}] {person_type.title()} person detected (confidence: {shown_confidence:.2f})"
+        self.publish('detection_view', {
+            'person_type': person_type,
+            'person_name': person_name,
+            'source': source,
+            'log_entry': log_entry
+        })
+        
+        # Store in local logs
+        self.store_detection_log(timestamp, person_type, confidence, source, person_name)
+        
+        incident_id = data.get('incident_id')
+        if incident_id:
+            self.recent_incidents.record(incident_id, data)
+        
+        # Send notification (webcam alerts wait until their video clip has been finalized)
+        if not data.get('evidence_pending'):
+            self.send_notification(person_type, timestamp, person_name, source, incident_id)
+    
+    def handle_evidence(self, data):
+        """Handle an incident whose evidence has been written: index it and send the deferred notification"""
+        incident_id = data.get('incident_id')
+        if incident_id:
+            self.recent_incidents.record(incident_id, data)
+        
+        self.send_notification(data.get('person_type', 'unknown'), data.get('timestamp'),
+                               data.get('person_name', 'Unknown'), data.get('source', 'unknown'), incident_id)
+    
+    def store_detection_log(self, timestamp, person_type, confidence, source, person_name="Unknown"):
+        """Store detection event in local log file"""
+        try:
+            log_data = {
+                'timestamp': timestamp,
+                'person_type': person_type,
+                'person_name': person_name,
+                'confidence': confidence,
+                'source': source,
+                'device_id': 'unified_security_system'
+            }
+            
+            # Queue for the local detection log; records are written in batches in the background
+            self.log_writer.append(log_data)
+        
+        except Exception as e:
+            print(f"Error storing log: {e}")
+    
+    def send_notification(self, person_type, timestamp, person_name="Unknown", source="unknown", incident_id=None):
+        """Add a detection to its alert incident; one email is sent per incident when its window closes"""
+        # Check notification settings
+        if person_type == 'authorized' and not self.settings['notify_authorized']:
+            return
+        if person_type == 'unauthorized' and not self.settings['notify_unauthorized']:
+            return
+        
+        event = {
+            'timestamp': timestamp,
+            'incident_id': incident_id,
+            'evidence': self.recent_incidents.evidence(incident_id)
+        }
+        self.alert_coalescer.add((source, person_type, person_name), event)
+        if self.alert_coalescer.window <= 0:
+            self.flush_alerts()
+    
+    def flush_alerts(self, incidents=None):
+        """Send one email for each incident whose coalescing window has closed"""
+        if incidents is None:
+            incidents = self.alert_coalescer.pop_due()
+        for incident in incidents:
+            self.send_incident_notification(incident)
+    
+    def send_incident_notification(self, incident):
+        """Send email notification for an incident with a thumbnail strip and a single video clip"""
+        source, person_type, person_name = incident['key']
+        events = incident['events']
+        timestamp = events[0]['timestamp']
+        
+        try:
+            if person_type == 'authorized':
+                title = "Authorized Access"
+                if source == 'webcam':
+                    body = f"{person_name} detected via webcam at {timestamp}"
+                else:
+                    body = f"Authorized person detected via Jetson Nano at {timestamp}"
+            else:
+                title = "Security Alert"
+                if source == 'webcam':
+                    body = f"Unauthorized person ({person_name}) detected via webcam at {timestamp}"
+                else:
+                    body = f"Unauthorized person detected via Jetson Nano at {timestamp}"
+            
+            if len(events) > 1:
+                body += f" ({len(events)} detections coalesced, last at {events[-1]['timestamp']})"
+            
+            # Queue email notification with attachments for unauthorized detections
+            evidence = incident_evidence(incident)
+            evidence['event_count'] = len(events)
+            if self.send_email_notification(title, body, person_type, evidence):
+                print(f"Email queued: {title} - {body}")
+                self.publish('status', f"Email queued: {title}")
+        
+        except Exception as e:
+            print(f"Error sending notification: {e}")
+    
+    def send_email_notification(self, subject, body, alert_type, evidence=None):
+        """
+        Queue an email notification with evidence attachments for the background dispatcher
+        
+        Args:
+            evidence: Dict with the incident's photo_path, video_path, summary_path, thumbnail_paths
+                      and event_count (any may be missing)
+        
+        Returns:
+            True if the email was queued
+        """
+        try:
+            settings = self.settings['email']
+            if not settings or not settings.get('recipient', '').strip():
+                raise Exception("No recipient email configured. Please set your email address in Settings.")
+            
+            # Validate hardcoded credentials
+            if settings['sender'] == "your-security-system@gmail.com" or settings['password'] == "your-app-password-here":
+                raise Exception("Email system not configured properly. Please contact the system administrator.")
+            
+            # The message is built (attachments read) and sent on the email dispatcher thread
+            queued = self.email_dispatcher.submit(
+                settings,
+                lambda: compose_alert_email(settings, subject, body, alert_type, evidence, self.attachment_limit_mb),
+                subject)
+            if not queued:
+                raise Exception("Email queue is full")
+            return True
+        
+        except Exception as e:
+            print(f"❌ Failed to send email: {e}")
+            self.publish('status', f"Email failed: {str(e)[:50]}...")
+            return False
+
+def compose_alert_email(settings, subject, body, alert_type, evidence=None, attachment_limit_mb=20):
+    """Build the alert email with its evidence attachments (runs on the email dispatcher thread)"""
+    sender_email = settings['sender']
+    recipient_email = settings['recipient']
+    evidence = evidence or {}
+    
+    # Create message
+    msg = MIMEMultipart()
+    msg['From'] = f"Smart Security System <{sender_email}>"
+    msg['To'] = recipient_email
+    msg['Subject'] = f"🛡️ Security Alert: {subject}"
+    
+    # Evidence files written for this incident (unauthorized webcam detections only)
+    photo_path = evidence.get('photo_path')
+    video_path = evidence.get('video_path')
+    summary_path = evidence.get('summary_path')
+    thumbnail_paths = evidence.get('thumbnail_paths') or []
+    event_count = evidence.get('event_count', 1)
+    
+    # Several detections are shown as one strip of thumbnails instead of separate photos
+    strip_data = build_thumbnail_strip(thumbnail_paths) if len(thumbnail_paths) > 1 else None
+    
+    # Attachments share one size budget; the clip gets whatever the photos and report leave
+    # Anything that does not fit is referenced by its local path instead
+    budget = AttachmentBudget(attachment_limit_mb * 1024 * 1024)
+    video_attachment, video_is_preview = None, False
+    photo_attached = summary_attached = False
+    if alert_type == "unauthorized":
+        if strip_data and not budget.take(len(strip_data)):
+            print(f"⚠️ Thumbnail strip too large to attach ({len(strip_data)/1024/1024:.1f}MB), trying the photo")
+            strip_data = None
+        if not strip_data and photo_path and os.path.exists(photo_path):
+            photo_attached = budget.take(os.path.getsize(photo_path))
+        if summary_path and os.path.exists(summary_path):
+            summary_attached = budget.take(os.path.getsize(summary_path))
+        video_attachment, video_is_preview = prepare_clip_attachment(video_path, budget)
+    
+    # Enhanced HTML email body
+    if alert_type == "test":
+        html_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
+                <h2 style="color: #2196F3; text-align: center;">
+                    🛡️ Smart Security System - Test Email
+                </h2>
+                <div style="background: #f0f8ff; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <p><strong>✅ Email Configuration Test</strong></p>
+                    <p>{body}</p>
+                </div>
+                <hr style="border: 1px solid #eee; margin: 20px 0;">
+                <p style="font-size: 12px; color: #666; text-align: center;">
+                    This is an automated test message from your Smart Security System.<br>
+                    If you received this, your email notifications are working correctly!
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+    else:
+        # Real security alert with evidence
+        evidence_section = ""
+        if photo_path or video_path or summary_path:
+            evidence_section = """
+            <div style="background: #fff3cd; padding: 15px; border-radius: 5px; margin: 20px 0; border-left: 4px solid #ffc107;">
+                <p><strong>📋 Evidence Attached:</strong></p>
+                <ul>
+            """
+            if strip_data:
+                evidence_section += f"<li>📸 Detection Photos: {len(thumbnail_paths)} thumbnails (detection_strip.jpg)</li>"
+            elif photo_path and photo_attached:
+                evidence_section += f"<li>📸 Detection Photo: {os.path.basename(photo_path)}</li>"
+            elif photo_path:
+                evidence_section += f"<li>📸 Detection Photo (too large to attach): {local_file_link(photo_path)}</li>"
+            if video_path and video_is_preview:
+                evidence_section += (f"<li>📹 Video Preview: {os.path.basename(video_attachment)} "
+                                     f"(full resolution clip stored locally: {local_file_link(video_path)})</li>")
+            elif video_path and video_attachment:
+                evidence_section += f"<li>📹 Video Clip: {os.path.basename(video_path)}</li>"
+            elif video_path:
+                evidence_section += f"<li>📹 Video Clip (too large to attach): {local_file_link(video_path)}</li>"
+            if summary_path and summary_attached:
+                evidence_section += f"<li>📄 Detailed Report: {os.path.basename(summary_path)}</li>"
+            elif summary_path:
+                evidence_section += f"<li>📄 Detailed Report (too large to attach): {local_file_link(summary_path)}</li>"
+            evidence_section += """
+                </ul>
+            </div>
+            """
+        
+        alert_color = "#4CAF50" if alert_type == "authorized" else "#f44336"
+        html_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
+                <h2 style="color: {alert_color}; text-align: center;">
+                    🛡️ SECURITY ALERT
+                </h2>
+                <div style="background: {'#e8f5e8' if alert_type == 'authorized' else '#ffebee'}; padding: 15px; border-radius: 5px; margin: 20px 0; border-left: 4px solid {alert_color};">
+                    <p><strong>Alert Type:</strong> {subject}</p>
+                    <p><strong>Details:</strong> {body}</p>
+                    <p><strong>Detections:</strong> {event_count}</p>
+                    <p><strong>Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+                    <p><strong>Status:</strong> <span style="color: {alert_color}; font-weight: bold;">{alert_type.upper()}</span></p>
+                </div>
+                
+                {evidence_section}
+                
+                <div style="background: #f8f9fa; padding: 10px; border-radius: 5px; margin: 20px 0;">
+                    <p><strong>⚠️ Next Steps:</strong></p>
+                    <ul>
+                        <li>Review attached evidence carefully</li>
+                        <li>Verify if this was authorized access</li>
+                        <li>Contact security personnel if needed</li>
+                        <li>Evidence files are stored locally and auto-deleted after 7 days</li>
+                    </ul>
+                </div>
+                
+                <hr style="border: 1px solid #eee; margin: 20px 0;">
+                <p style="font-size: 12px; color: #666; text-align: center;">
+                    This is an automated security alert from your Smart Security System.<br>
+                    Evidence files are automatically cleaned up after 7 days for privacy.
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+    
+    msg.attach(MIMEText(html_body, 'html'))
+    
+    # Attach evidence files for unauthorized detections
+    if alert_type == "unauthorized":
+        # Attach the thumbnail strip, or the detection photo for a single detection
+        if strip_data:
+            image = MIMEImage(strip_data)
+            image.add_header('Content-Disposition', 'attachment; filename=detection_strip.jpg')
+            msg.attach(image)
+            print(f"📎 Thumbnail strip attached: {len(thumbnail_paths)} photos")
+        elif photo_attached:
+            try:
+                with open(photo_path, "rb") as f:
+                    img_data = f.read()
+                image = MIMEImage(img_data)
+                image.add_header('Content-Disposition', f'attachment; filename={os.path.basename(photo_path)}')
+                msg.attach(image)
+                print(f"📎 Photo attached: {os.path.basename(photo_path)}")
+            except Exception as e:
+                print(f"⚠️ Could not attach photo: {e}")
+        
+        # Attach video file (or its preview), encoded chunk by chunk
+        if video_attachment:
+            try:
+                msg.attach(file_attachment(video_attachment, 'video', 'mp4'))
+                print(f"📎 Video attached: {os.path.basename(video_attachment)}")
+            except Exception as e:
+                print(f"⚠️ Could not attach video: {e}")
+        
+        # Attach summary report
+        if summary_attached:
+            try:
+                msg.attach(file_attachment(summary_path))
+                print(f"📎 Report attached: {os.path.basename(summary_path)}")
+            except Exception as e:
+                print(f"⚠️ Could not attach report: {e}")
+    
+    return msg
+
@@ -0,0 +1,241 @@
+"""
+Evidence Capture
+Detection photo, pre/post-detection clip and text summary for unauthorized detections, written in the background
+"""
+
+import os
+from datetime import datetime
+import cv2
+
+def evidence_stem(detection_data):
+    """Unique part of an incident's evidence filenames: its incident id (overlapping clips finish together)"""
+    incident_id = detection_data.get('incident_id')
+    if incident_id:
+        return str(incident_id)
+    return datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+
+class EvidenceCapture:
+    def __init__(self, evidence_writer, clip_recorder, event_core, buffer_seconds=10, clip_duration=20,
+                 recording_fps=15, detection_cooldown=3):
+        """
+        Starts the evidence for a detection and posts 'evidence_ready' to the event core when it is complete
+        
+        Args:
+            evidence_writer: EvidenceWriter whose completion queue is the event core's queue
+            clip_recorder: ClipRecorder over the pre-detection frame buffer
+            event_core: EventProcessor receiving the completed evidence
+            buffer_seconds: Seconds of video kept before a detection
+            clip_duration: Total clip length in seconds (pre-detection buffer included)
+            recording_fps: Frame rate reported until the clip's real rate is known
+            detection_cooldown: Shown in the summary report
+        """
+        self.evidence_writer = evidence_writer
+        self.clip_recorder = clip_recorder
+        self.event_core = event_core
+        self.buffer_seconds = buffer_seconds
+        self.clip_duration = clip_duration
+        self.recording_fps = recording_fps
+        self.detection_cooldown = detection_cooldown
+    
+    def capture(self, detection_data, frame):
+        """
+        Save the photo now and start the clip; marks detection_data as evidence_pending
+        
+        Args:
+            detection_data: Detection dict (updated in place with the pending evidence)
+            frame: BGR frame at the moment of detection
+        """
+        print("🎥 Capturing evidence for unauthorized detection...")
+        
+        # Create evidence directories only when needed
+        clips_dir = "security_clips"
+        logs_dir = "security_logs"
+        photos_dir = "security_photos"
+        
+        os.makedirs(clips_dir, exist_ok=True)
+        os.makedirs(logs_dir, exist_ok=True)
+        os.makedirs(photos_dir, exist_ok=True)
+        
+        # Highlighted frame used for both the photo and the clip
+        highlighted_frame = self.add_detection_overlay(frame, detection_data, datetime.now())
+        
+        # Encode and save the detection photo on the evidence writer thread
+        photo_future = self.evidence_writer.submit(self.capture_detection_photo, detection_data,
+                                                   photos_dir, highlighted_frame)
+        
+        detection_data.update({
+            'evidence_pending': True,
+            'evidence': {
+                'photo_path': None,
+                'video_path': None,
+                'summary_path': None
+            }
+        })
+        evidence_base = dict(detection_data)
+        
+        def clip_finished(video_clip):
+            # Runs on the recorder thread once the post-detection footage has been written
+            queued = self.evidence_writer.submit(self.finish_detection_evidence, evidence_base, logs_dir,
+                                                 photo_future, video_clip, message='evidence_ready')
+            if queued is None:
+                # Still send the alert, just without the evidence that could not be saved
+                self.event_core.submit('evidence_ready', dict(evidence_base, evidence_pending=False), block=True)
+        
+        # Start recording the video clip; it is finalized in the background
+        video_path = self.capture_detection_video(detection_data, clips_dir, highlighted_frame, clip_finished)
+        detection_data['evidence']['video_path'] = video_path
+        if video_path is None:
+            clip_finished(None)
+    
+    def capture_detection_photo(self, detection_data, photos_dir, overlay_frame):
+        """Save the detection photo with overlay (runs on the evidence writer thread)"""
+        try:
+            filename = f"detection_{evidence_stem(detection_data)}_{int(detection_data.get('confidence', 0)*100)}.jpg"
+            photo_path = os.path.join(photos_dir, filename)
+            
+            # Save photo
+            cv2.imwrite(photo_path, overlay_frame)
+            
+            # Get file size
+            file_size = os.path.getsize(photo_path)
+            print(f"📸 Detection photo saved: {filename} ({file_size/1024:.1f}KB)")
+            
+            return photo_path
+            
+        except Exception as e:
+            print(f"❌ Error capturing detection photo: {e}")
+            return None
+    
+    def capture_detection_video(self, detection_data, clips_dir, highlighted_frame, on_finished=None):
+        """Start recording a clip of the buffered and following frames (or extend the active one)"""
+        try:
+            filename = f"detection_{evidence_stem(detection_data)}_{int(detection_data.get('confidence', 0)*100)}.mp4"
+            video_path = os.path.join(clips_dir, filename)
+            
+            if highlighted_frame is None:
+                return None
+            
+            # The highlighted frame is inserted into the clip at the moment of detection;
+            # the recorder writes the pre-detection buffer, then keeps recording live frames
+            post_detection_seconds = self.clip_duration - self.buffer_seconds
+            video_path = self.clip_recorder.trigger(video_path, post_detection_seconds, highlighted_frame, on_finished)
+            print(f"📹 Recording detection video: {os.path.basename(video_path)}")
+            
+            return video_path
+            
+        except Exception as e:
+            print(f"❌ Error creating video clip: {e}")
+            return None
+    
+    def add_detection_overlay(self, frame, detection_data, timestamp):
+        """Add visual overlay to detection frame"""
+        if frame is None:
+            return None
+            
+        overlay_frame = frame.copy()
+        
+        # Add red border for unauthorized detection
+        border_color = (0, 0, 255)  # Red for unauthorized
+        border_thickness = 8
+        cv2.rectangle(overlay_frame, (0, 0), 
+                     (frame.shape[1]-1, frame.shape[0]-1), 
+                     border_color, border_thickness)
+        
+        # Add detection information
+        person_name = detection_data.get('person_name', 'Unknown')
+        confidence = detection_data.get('confidence', 0)
+        timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Main detection text
+        main_text = f"UNAUTHORIZED: {person_name}"
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 1.0
+        text_thickness = 2
+        
+        # Get text size for background
+        (text_width, text_height), _ = cv2.getTextSize(main_text, font, font_scale, text_thickness)
+        
+        # Add semi-transparent background
+        overlay = overlay_frame.copy()
+        cv2.rectangle(overlay, (10, 10), (text_width + 30, text_height + 80), (0, 0, 0), -1)
+        cv2.addWeighted(overlay, 0.7, overlay_frame, 0.3, 0, overlay_frame)
+        
+        # Add main text
+        cv2.putText(overlay_frame, main_text, (20, 35), 
+                   font, font_scale, (0, 0, 255), text_thickness)
+        
+        # Add confidence score
+        confidence_text = f"Confidence: {confidence:.2f}"
+        cv2.putText(overlay_frame, confidence_text, (20, 60), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        
+        # Add timestamp
+        cv2.putText(overlay_frame, timestamp_str, (20, 80), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        
+        # Add timestamp at bottom of frame
+        bottom_text = f"Security Alert - {timestamp_str}"
+        cv2.putText(overlay_frame, bottom_text, 
+                   (20, frame.shape[0] - 20), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        
+        return overlay_frame
+    
+    def finish_detection_evidence(self, detection_data, logs_dir, photo_future, video_clip):
+        """Evidence writer job: write the summary once the photo and clip are done, return the complete event"""
+        photo_path = photo_future.result() if photo_future else None
+        video_path = video_clip['path'] if video_clip else None
+        
+        evidence_data = dict(detection_data, evidence_pending=False)
+        if video_clip:
+            evidence_data['video_clip'] = video_clip
+        
+        summary_path = self.create_detection_summary(evidence_data, logs_dir, photo_path, video_path)
+        evidence_data['evidence'] = {
+            'photo_path': photo_path,
+            'video_path': video_path,
+            'summary_path': summary_path
+        }
+        return evidence_data
+    
+    def create_detection_summary(self, detection_data, logs_dir, photo_path, video_path):
+        """Create a text summary file for the detection"""
+        try:
+            timestamp = datetime.now()
+            summary_filename = f"detection_summary_{evidence_stem(detection_data)}.txt"
+            summary_path = os.path.join(logs_dir, summary_filename)
+            
+            with open(summary_path, 'w') as f:
+                f.write("SECURITY SYSTEM DETECTION REPORT\n")
+                f.write("=" * 40 + "\n\n")
+                f.write(f"Detection Time: {detection_data.get('timestamp', timestamp.strftime('%Y-%m-%d %H:%M:%S'))}\n")
+                f.write(f"Person Type: {detection_data.get('person_type', 'Unknown')}\n")
+                f.write(f"Person Name: {detection_data.get('person_name', 'Unknown')}\n")
+                f.write(f"Confidence: {detection_data.get('confidence', 0):.2f}\n")
+                f.write(f"Source: {detection_data.get('source', 'Unknown')}\n")
+                f.write(f"Device: unified_security_system\n")
+                
+                f.write(f"\nEvidence Files:\n")
+                if photo_path:
+                    f.write(f"  Detection Photo: {os.path.basename(photo_path)}\n")
+                if video_path:
+                    f.write(f"  Video Clip: {os.path.basename(video_path)}\n")
+                
+                if 'video_clip' in detection_data:
+                    video_info = detection_data['video_clip']
+                    f.write(f"\nVideo Clip Information:\n")
+                    f.write(f"  Duration: {video_info.get('duration_seconds', 0):.1f} seconds\n")
+                    f.write(f"  File Size: {video_info.get('file_size_mb', 0):.1f} MB\n")
+                    f.write(f"  Frame Count: {video_info.get('frame_count', 0)}\n")
+                
+                f.write(f"\nSystem Configuration:\n")
+                f.write(f"  Video Buffer: {self.buffer_seconds} seconds\n")
+                f.write(f"  Total Clip Duration: {self.clip_duration} seconds\n")
+                f.write(f"  Recording FPS: {detection_data.get('video_clip', {}).get('fps', self.recording_fps):.1f}\n")
+                f.write(f"  Detection Cooldown: {self.detection_cooldown} seconds\n")
+                
+            return summary_path
+            
+        except Exception as e:
+            print(f"Error creating summary: {e}")
+            return None
@@ -0,0 +1,114 @@
+"""
+Evidence Writer
+Bounded background queue that encodes and saves detection evidence off the capture and detection threads
+"""
+
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class EvidenceWriter:
+    def __init__(self, completion_queue=None, workers=1, maxsize=32):
+        """
+        Writer threads that run evidence jobs (photo encoding, summaries) in the background
+        
+        Args:
+            completion_queue: Queue that finished jobs report to as (message, result), e.g. the GUI message queue
+            workers: Number of writer threads; with one, jobs finish in the order they were submitted
+            maxsize: Jobs allowed to wait; further jobs are dropped so callers never block on a slow disk
+        """
+        self.completion_queue = completion_queue
+        self.jobs = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self.worker, name=f"evidence-writer-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def submit(self, job, *args, message=None):
+        """
+        Queue job(*args) to run on a writer thread
+        
+        Args:
+            job: Callable doing the slow work; its return value is the job result
+            message: If given, (message, result) is put on the completion queue when the job finishes
+        
+        Returns:
+            Future for the job result, or None if the queue was full and the job was dropped
+        """
+        future = Future()
+        try:
+            self.jobs.put_nowait((future, job, args, message))
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️ Evidence queue full, dropped job ({self.dropped} dropped so far)")
+            return None
+        return future
+    
+    def pending(self):
+        """Number of jobs waiting to be written"""
+        return self.jobs.qsize()
+    
+    def worker(self):
+        """Writer thread: run jobs until the stop sentinel arrives"""
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                break
+            
+            future, job, args, message = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            
+            try:
+                result = job(*args)
+            except Exception as e:
+                print(f"❌ Evidence job failed: {e}")
+                future.set_exception(e)
+                continue
+            
+            future.set_result(result)
+            if message is not None and self.completion_queue is not None:
+                self.completion_queue.put((message, result))
+    
+    def stop(self, timeout=10):
+        """Finish the queued jobs, then stop the writer threads"""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+class RecentIncidents:
+    def __init__(self, maxlen=200):
+        """
+        In-memory index of the most recent incidents, so their evidence is found by id instead of a directory scan
+        
+        Args:
+            maxlen: Number of incidents remembered; the oldest are forgotten first
+        """
+        self.incidents = OrderedDict()
+        self.maxlen = maxlen
+        self.lock = threading.Lock()
+    
+    def record(self, incident_id, detection_data):
+        """Add or update an incident (called again once its evidence has been written)"""
+        with self.lock:
+            self.incidents.pop(incident_id, None)
+            self.incidents[incident_id] = detection_data
+            while len(self.incidents) > self.maxlen:
+                self.incidents.popitem(last=False)
+    
+    def get(self, incident_id):
+        """Return the detection data recorded for an incident, or None"""
+        with self.lock:
+            return self.incidents.get(incident_id)
+    
+    def evidence(self, incident_id):
+        """Return the incident's evidence paths (photo_path, video_path, summary_path), or an empty dict"""
+        incident = self.get(incident_id)
+        if incident is None:
+            return {}
+        return incident.get('evidence') or {}
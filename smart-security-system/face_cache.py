@@ -0,0 +1,248 @@
+"""
+Face Encoding Cache
+Keeps authorized face encodings on disk so only new or changed images are re-encoded
+"""
+
+import os
+import json
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+ENCODING_SIZE = 128
+CACHE_VERSION = 2
+
+def name_from_filename(filename):
+    """Get the person name from an authorized face filename (name_timestamp.jpg)"""
+    base = os.path.splitext(filename)[0]
+    name, separator, suffix = base.rpartition('_')
+    # Only strip a trailing numeric timestamp so names containing underscores survive
+    if separator and name and suffix.isdigit():
+        return name
+    return base
+
+def encode_face_image(path):
+    """Load an image file and return the encoding of its largest face, or None"""
+    import face_recognition  # Heavy import, only needed once images have to be encoded
+    
+    try:
+        image = face_recognition.load_image_file(path)
+        face_locations = face_recognition.face_locations(image)
+        
+        if face_locations:
+            # The enrolled person is the one closest to the camera, not whoever happens to be listed first
+            largest = max(face_locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]))
+            encodings = face_recognition.face_encodings(image, [largest])
+            if encodings:
+                print(f"Encoded authorized face: {os.path.basename(path)}")
+                return encodings[0]
+            
+    except Exception as e:
+        print(f"Error loading {os.path.basename(path)}: {e}")
+    
+    return None
+
+class FaceEncodingCache:
+    def __init__(self, faces_dir, cache_name=".encodings"):
+        """
+        Initialize the encoding cache for a directory of face images
+        
+        Args:
+            faces_dir: Directory holding the authorized face images
+            cache_name: Base name of the matrix (.npy) and manifest (.json) files
+        """
+        self.faces_dir = faces_dir
+        self.matrix_path = os.path.join(faces_dir, cache_name + ".npy")
+        self.manifest_path = os.path.join(faces_dir, cache_name + ".json")
+        
+        # filename -> {'size', 'mtime_ns', 'name', 'row'} (row is None when no face was found)
+        self.entries = {}
+        self.matrix = np.zeros((0, ENCODING_SIZE), dtype=np.float64)
+    
+    def load(self):
+        """Load the manifest and memory map the encoding matrix"""
+        self.entries = {}
+        self.matrix = np.zeros((0, ENCODING_SIZE), dtype=np.float64)
+        
+        if not os.path.exists(self.manifest_path) or not os.path.exists(self.matrix_path):
+            return False
+        
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            
+            matrix = np.load(self.matrix_path, mmap_mode='r')
+            
+            # The manifest is written after the matrix, so a row count mismatch means an interrupted save
+            if manifest.get('version') != CACHE_VERSION or manifest.get('rows') != matrix.shape[0]:
+                print("Face encoding cache is stale, rebuilding")
+                return False
+            
+            self.entries = manifest.get('entries', {})
+            self.matrix = matrix
+            return True
+        
+        except Exception as e:
+            print(f"Could not load face encoding cache: {e}")
+            self.entries = {}
+            return False
+    
+    def sync(self, encode_image, name_for_file):
+        """
+        Bring the cache up to date with the images in the faces directory
+        
+        Args:
+            encode_image: Callable taking an image path, returning an encoding or None
+            name_for_file: Callable mapping an image filename to a person name
+        
+        Returns:
+            Tuple of (encoding matrix, list of names) with one row per usable image
+        """
+        if not self.entries:
+            self.load()
+        
+        changed = False
+        new_entries = {}
+        rows = []
+        names = []
+        
+        for filename in sorted(os.listdir(self.faces_dir)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            
+            path = os.path.join(self.faces_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            
+            cached = self.entries.get(filename)
+            if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+                entry = dict(cached)
+                encoding = self.matrix[cached['row']] if cached['row'] is not None else None
+            else:
+                changed = True
+                entry = {
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'name': name_for_file(filename)
+                }
+                encoding = encode_image(path)
+                if encoding is None:
+                    print(f"No face found in {filename}")
+            
+            if encoding is not None:
+                entry['row'] = len(rows)
+                rows.append(encoding)
+                names.append(entry['name'])
+            else:
+                entry['row'] = None
+            
+            # Rows appended by add_file are out of filename order; renumbering them means rewriting the matrix
+            if cached and cached['row'] != entry['row']:
+                changed = True
+            
+            new_entries[filename] = entry
+        
+        # Deleted images also invalidate the stored matrix
+        if set(new_entries) != set(self.entries):
+            changed = True
+        
+        if changed:
+            if rows:
+                matrix = np.asarray(np.stack(rows), dtype=np.float64)
+            else:
+                matrix = np.zeros((0, ENCODING_SIZE), dtype=np.float64)
+            self.save(matrix, new_entries)
+        
+        # Rows were collected in the same order as names, so pair them directly rather than trusting self.matrix
+        if rows:
+            return np.asarray(np.stack(rows), dtype=np.float64), names
+        return np.zeros((0, ENCODING_SIZE), dtype=np.float64), names
+    
+    def names(self):
+        """Return the person names in matrix row order"""
+        names = [None] * self.matrix.shape[0]
+        for entry in self.entries.values():
+            if entry['row'] is not None:
+                names[entry['row']] = entry['name']
+        return names
+    
+    def add_file(self, filename, encode_image, name_for_file):
+        """
+        Encode one new image and append it to the cache without touching the other rows
+        
+        Returns:
+            True if a face was found in the image
+        """
+        if not self.entries:
+            self.load()
+        
+        if filename in self.entries:
+            self.remove_files([filename])
+        
+        path = os.path.join(self.faces_dir, filename)
+        stat = os.stat(path)
+        encoding = encode_image(path)
+        
+        entry = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'name': name_for_file(filename),
+            'row': None
+        }
+        matrix = self.matrix
+        if encoding is not None:
+            entry['row'] = matrix.shape[0]
+            matrix = np.concatenate([matrix, np.asarray(encoding, dtype=np.float64).reshape(1, ENCODING_SIZE)])
+        
+        entries = dict(self.entries)
+        entries[filename] = entry
+        self.save(matrix, entries)
+        return encoding is not None
+    
+    def remove_files(self, filenames):
+        """Drop the rows belonging to the given images and renumber the remaining rows"""
+        if not self.entries:
+            self.load()
+        
+        removed_rows = sorted(self.entries[f]['row'] for f in filenames
+                              if f in self.entries and self.entries[f]['row'] is not None)
+        
+        entries = {}
+        for filename, entry in self.entries.items():
+            if filename in filenames:
+                continue
+            entry = dict(entry)
+            if entry['row'] is not None:
+                # Shift down by the number of removed rows that came before this one
+                entry['row'] -= int(np.searchsorted(removed_rows, entry['row']))
+            entries[filename] = entry
+        
+        matrix = np.delete(np.asarray(self.matrix), removed_rows, axis=0)
+        self.save(matrix, entries)
+    
+    def save(self, matrix, entries):
+        """Atomically replace the on-disk matrix and manifest"""
+        try:
+            tmp_matrix = self.matrix_path + ".tmp"
+            with open(tmp_matrix, 'wb') as f:
+                np.save(f, matrix)
+            os.replace(tmp_matrix, self.matrix_path)
+            
+            manifest = {
+                'version': CACHE_VERSION,
+                'rows': int(matrix.shape[0]),
+                'entries': entries
+            }
+            tmp_manifest = self.manifest_path + ".tmp"
+            with open(tmp_manifest, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_manifest, self.manifest_path)
+            
+            self.entries = entries
+            self.matrix = np.load(self.matrix_path, mmap_mode='r')
+        
+        except Exception as e:
+            print(f"Could not save face encoding cache: {e}")
+            self.entries = entries
+            self.matrix = matrix
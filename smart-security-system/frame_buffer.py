@@ -0,0 +1,177 @@
+"""
+Frame Ring Buffer
+Preallocated, time-indexed pre-detection video buffer that capture writes into in place
+"""
+
+import math
+import threading
+import numpy as np
+
+class FrameRingBuffer:
+    def __init__(self, seconds, max_bytes, guard=2, fps=15, margin=1.25):
+        """
+        Ring of frames plus their capture timestamps covering the last few seconds
+        
+        Args:
+            seconds: How much video before a detection readers get back
+            max_bytes: Memory budget for the frame storage; the ring never grows beyond it
+            guard: Slots next to the write position that readers skip, so a frame is never
+                   handed out while capture is about to overwrite it
+            fps: Expected capture rate, used to size the ring until the real rate has been measured
+            margin: Extra room over seconds x fps for capture rate jitter
+        """
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.guard = guard
+        self.fps = fps
+        self.margin = margin
+        self.capacity = 0
+        self.frames = None  # Allocated on the first write, once the frame size is known
+        self.timestamps = None
+        self.write_count = 0  # Total frames ever written; frame n lives in slot n % capacity
+        self.lock = threading.RLock()
+        self.truncation_warned = False
+    
+    def slots_needed(self, frame_nbytes, fps):
+        """Ring size for seconds x fps (plus margin and guard), capped by the byte budget"""
+        wanted = int(math.ceil(self.seconds * fps * self.margin)) + self.guard
+        budget = max(self.guard + 2, int(self.max_bytes // frame_nbytes))
+        # Cutting into the margin is fine; warn when the budget cannot hold the pre-detection seconds themselves
+        if budget - self.guard < self.seconds * fps and not self.truncation_warned:
+            self.truncation_warned = True
+            print(f"⚠️ Video buffer budget ({self.max_bytes / 1024 / 1024:.0f}MB) holds only "
+                  f"{(budget - self.guard) / fps:.1f}s of pre-detection video at {fps:.1f} fps "
+                  f"(wanted {self.seconds}s); raise buffer_max_mb or lower the resolution")
+        return max(self.guard + 2, min(wanted, budget))
+    
+    def allocate(self, frame, capacity):
+        """Create a ring of capacity slots, keeping the newest frames and their sequence numbers"""
+        frames = np.empty((capacity,) + frame.shape, dtype=frame.dtype)
+        timestamps = np.zeros(capacity, dtype=np.float64)
+        if self.frames is not None and self.frames.shape[1:] == frame.shape:
+            for sequence in range(max(0, self.write_count - min(self.capacity, capacity)), self.write_count):
+                frames[sequence % capacity] = self.frames[sequence % self.capacity]
+                timestamps[sequence % capacity] = self.timestamps[sequence % self.capacity]
+        else:
+            self.write_count = 0
+        # Readers that still hold the old array keep reading it; capture only writes to the new one
+        self.frames = frames
+        self.timestamps = timestamps
+        self.capacity = capacity
+        print(f"Video buffer: {self.capacity} frames ({self.frames.nbytes / 1024 / 1024:.0f}MB)")
+    
+    def write(self, frame, timestamp):
+        """Copy a frame into the next slot; no allocation once the buffer exists"""
+        with self.lock:
+            if self.frames is None or self.frames.shape[1:] != frame.shape:
+                self.allocate(frame, self.slots_needed(frame.nbytes, self.fps))
+            elif self.write_count and self.write_count % self.capacity == 0:
+                # Once per lap, resize to the measured capture rate if it differs a lot from the estimate
+                self.resize_to_rate(frame)
+            
+            slot = self.write_count % self.capacity
+            np.copyto(self.frames[slot], frame)
+            self.timestamps[slot] = timestamp
+            self.write_count += 1
+    
+    def resize_to_rate(self, frame):
+        """Grow or shrink the ring to the measured capture rate (called with the lock held)"""
+        end = self.write_count
+        first = max(0, end - self.capacity)
+        elapsed = self.timestamps[(end - 1) % self.capacity] - self.timestamps[first % self.capacity]
+        if elapsed <= 0:
+            return
+        fps = (end - first - 1) / elapsed
+        needed = self.slots_needed(frame.nbytes, fps)
+        if needed > self.capacity or needed < self.capacity // 2:
+            self.allocate(frame, needed)
+    
+    def clear(self):
+        """Forget all frames (the memory stays allocated)"""
+        with self.lock:
+            self.write_count = 0
+    
+    def __len__(self):
+        return min(self.write_count, self.capacity)
+    
+    def sequence_range(self, seconds=None):
+        """
+        Return (first, end) sequence numbers of the safe-to-read frames from the last few seconds
+        
+        Args:
+            seconds: Time window ending at the newest frame (default: the buffer's seconds)
+        """
+        if seconds is None:
+            seconds = self.seconds
+        
+        with self.lock:
+            end = self.write_count
+            first = max(0, end - self.capacity + self.guard)
+            if first >= end:
+                return first, end
+            
+            # Timestamps increase with the sequence number, so binary search for the window start
+            cutoff = self.timestamps[(end - 1) % self.capacity] - seconds
+            low, high = first, end - 1
+            while low < high:
+                middle = (low + high) // 2
+                if self.timestamps[middle % self.capacity] < cutoff:
+                    low = middle + 1
+                else:
+                    high = middle
+        return low, end
+    
+    def measured_fps(self, window=2.0):
+        """Capture rate over the last window seconds, or None before there are enough frames"""
+        first, end = self.sequence_range(window)
+        if end - first < 2:
+            return None
+        with self.lock:
+            elapsed = self.timestamps[(end - 1) % self.capacity] - self.timestamps[first % self.capacity]
+        if elapsed <= 0:
+            return None
+        return (end - first - 1) / elapsed
+    
+    def snapshot(self):
+        """
+        Zero-copy view of the buffered frames, oldest first
+        
+        Returns:
+            List of (frames, timestamps) array segments (at most two, since the ring may wrap).
+            The views are only valid until capture overwrites them; use iter_frames for long reads.
+        """
+        with self.lock:  # The ring can be resized by capture, so read it consistently
+            first, end = self.sequence_range()
+            frames, timestamps, capacity = self.frames, self.timestamps, self.capacity
+        if first >= end or frames is None:
+            return []
+        
+        start_slot = first % capacity
+        end_slot = end % capacity
+        if start_slot < end_slot:
+            return [(frames[start_slot:end_slot], timestamps[start_slot:end_slot])]
+        segments = [(frames[start_slot:], timestamps[start_slot:])]
+        if end_slot:
+            segments.append((frames[:end_slot], timestamps[:end_slot]))
+        return segments
+    
+    def iter_frames(self, first=None, end=None):
+        """
+        Yield (frame view, timestamp) for the last few seconds, oldest first, without copying
+        
+        Stops early if capture catches up with the reader, instead of handing out a frame that
+        is being overwritten.
+        """
+        safe_first, safe_end = self.sequence_range()
+        first = safe_first if first is None else max(first, safe_first)
+        end = safe_end if end is None else min(end, safe_end)
+        
+        for sequence in range(first, end):
+            with self.lock:
+                if self.write_count - sequence > self.capacity - self.guard:
+                    print("Frame buffer reader fell behind capture, clip truncated")
+                    return
+                slot = sequence % self.capacity
+                frames = self.frames  # A resize swaps the arrays; this frame stays valid in the one read here
+                timestamp = float(self.timestamps[slot])
+            yield frames[slot], timestamp
@@ -0,0 +1,124 @@
+"""
+Identity Store
+Groups authorized face encodings by person and matches against per-person centroids and exemplars
+"""
+
+from collections import OrderedDict
+import numpy as np
+from face_matcher import FaceMatcher, FaceMatch, pairwise_distances, ENCODING_SIZE, DEFAULT_TOLERANCE, DEFAULT_INDEX_MIN_SIZE, DEFAULT_NPROBE
+
+DEFAULT_MAX_EXEMPLARS = 5
+DEFAULT_SHORTLIST = 3
+
+def select_exemplars(encodings, centroid, max_exemplars):
+    """Pick up to max_exemplars diverse rows: the most typical one, then farthest-point sampling"""
+    if len(encodings) <= max_exemplars:
+        return encodings
+    
+    chosen = [int(np.argmin(np.linalg.norm(encodings - centroid, axis=1)))]
+    min_distances = np.linalg.norm(encodings - encodings[chosen[0]], axis=1)
+    while len(chosen) < max_exemplars:
+        next_row = int(np.argmax(min_distances))
+        chosen.append(next_row)
+        min_distances = np.minimum(min_distances, np.linalg.norm(encodings - encodings[next_row], axis=1))
+    return encodings[chosen]
+
+class IdentityStore:
+    def __init__(self, encodings, names, tolerance=DEFAULT_TOLERANCE, max_exemplars=DEFAULT_MAX_EXEMPLARS,
+                 shortlist=DEFAULT_SHORTLIST, index_min_size=DEFAULT_INDEX_MIN_SIZE, nprobe=DEFAULT_NPROBE,
+                 exact_decisions=True):
+        """
+        Build per-person identities from individual photo encodings
+        
+        Args:
+            encodings: Array-like of shape (N, 128), one row per authorized photo
+            names: List of N person names, one per encoding row
+            tolerance: Maximum distance for a face to count as a match
+            max_exemplars: Maximum encodings kept per person besides the centroid
+            shortlist: Number of closest centroids whose exemplars are checked per face
+            index_min_size: Passed to the exemplar FaceMatcher (IVF index for large galleries)
+            nprobe: Passed to the exemplar FaceMatcher
+            exact_decisions: Confirm faces the index could not match against every exemplar, so the
+                             authorized/unauthorized decision equals an exact search (False is faster for
+                             strangers but can report an enrolled person as unknown)
+        """
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        self.tolerance = tolerance
+        self.shortlist = shortlist
+        
+        rows_by_name = OrderedDict()
+        for row, name in enumerate(names):
+            rows_by_name.setdefault(name, []).append(row)
+        
+        self.names = list(rows_by_name)
+        self.photo_counts = [len(rows) for rows in rows_by_name.values()]
+        
+        centroids = []
+        exemplars = []
+        exemplar_owners = []
+        for identity, rows in enumerate(rows_by_name.values()):
+            person_encodings = encodings[rows]
+            centroid = person_encodings.mean(axis=0)
+            centroids.append(centroid)
+            
+            chosen = select_exemplars(person_encodings, centroid, max_exemplars)
+            exemplars.extend(chosen)
+            exemplar_owners.extend([identity] * len(chosen))
+        
+        # Exemplars are grouped by identity, so each person owns one contiguous slice of rows
+        self.exemplar_owners = np.asarray(exemplar_owners, dtype=np.int64)
+        self.exemplar_bounds = np.searchsorted(self.exemplar_owners, np.arange(len(self.names) + 1))
+        self.centroid_matcher = FaceMatcher(centroids, self.names, tolerance, index_min_size=None)
+        self.exemplar_matcher = FaceMatcher(exemplars, [self.names[owner] for owner in exemplar_owners],
+                                            tolerance, index_min_size=index_min_size, nprobe=nprobe,
+                                            exhaustive_fallback=exact_decisions)
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def identities(self):
+        """Return a list of (name, photo count) for every enrolled person"""
+        return list(zip(self.names, self.photo_counts))
+    
+    def match(self, face_encodings):
+        """
+        Match all faces of a frame against the enrolled identities
+        
+        Centroids are compared first; only the exemplars of the closest identities are then
+        checked. Faces that do not match any shortlisted identity are confirmed against every
+        exemplar, so an authorized face is never reported as unknown because of the shortlist.
+        
+        Returns:
+            List of FaceMatch, one per face
+        """
+        if len(face_encodings) == 0:
+            return []
+        
+        if len(self) == 0:
+            return [FaceMatch("Unknown", float('inf'), 0) for _ in range(len(face_encodings))]
+        
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        centroid_distances = self.centroid_matcher.distances(queries)
+        shortlist = min(self.shortlist, len(self))
+        candidates = np.argpartition(centroid_distances, shortlist - 1, axis=1)[:, :shortlist]
+        
+        exemplars = self.exemplar_matcher
+        results = []
+        unmatched = []
+        for face, identities in enumerate(candidates):
+            rows = np.concatenate([np.arange(self.exemplar_bounds[i], self.exemplar_bounds[i + 1]) for i in identities])
+            distances = pairwise_distances(queries[face:face + 1], exemplars.encodings[rows], exemplars.sq_norms[rows])[0]
+            best = int(np.argmin(distances))
+            distance = float(distances[best])
+            
+            if distance <= self.tolerance:
+                results.append(FaceMatch(self.names[self.exemplar_owners[rows[best]]], distance, 1 - distance))
+            else:
+                results.append(None)
+                unmatched.append(face)
+        
+        if unmatched:
+            for face, match in zip(unmatched, self.exemplar_matcher.match(queries[unmatched])):
+                results[face] = match
+        
+        return results
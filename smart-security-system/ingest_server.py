@@ -0,0 +1,305 @@
+"""
+Detection Ingest Server
+Concurrent HTTP endpoint for edge device detection signals, with keep-alive, body size caps and backpressure
+"""
+
+import json
+import time
+import queue
+import socket
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+PERSON_TYPES = ('authorized', 'unauthorized')
+
+def validate_detection(data):
+    """Return an error message for a malformed detection, or None if it can be queued"""
+    if not isinstance(data, dict):
+        return "expected a JSON object"
+    if data.get('person_type') is not None and data['person_type'] not in PERSON_TYPES:
+        return f"person_type must be one of {', '.join(PERSON_TYPES)}"
+    confidence = data.get('confidence')
+    if confidence is not None and (isinstance(confidence, bool) or not isinstance(confidence, (int, float))):
+        return "confidence must be a number"
+    if data.get('timestamp') is not None and not isinstance(data['timestamp'], str):
+        return "timestamp must be a string"
+    return None
+
+def parse_batch(body, content_type=""):
+    """
+    Split a batch body into items: a JSON array, or NDJSON (one JSON object per line)
+    
+    Returns:
+        List of (detection or None, error or None), one per item
+    """
+    text = body.decode('utf-8')
+    if 'ndjson' not in content_type and text.lstrip().startswith('['):
+        return [(item, None) for item in json.loads(text)]
+    
+    items = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append((json.loads(line), None))
+        except ValueError as e:
+            items.append((None, f"invalid JSON: {e}"))
+    return items
+
+class SignalHandler(BaseHTTPRequestHandler):
+    """Handles detection POSTs on a persistent (HTTP/1.1 keep-alive) connection"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes on a reused connection
+    
+    def setup(self):
+        self.timeout = self.server.idle_timeout  # Idle keep-alive connections give their worker back
+        super().setup()
+    
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def read_body(self, max_body):
+        """Read the request body, or reply with an error and return None"""
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self.close_connection = True
+            self.send_json(411, {"status": "error", "error": "Content-Length required"})
+            return None
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self.send_json(400, {"status": "error", "error": "invalid Content-Length"})
+            return None
+        if length > max_body:
+            # The oversized body is never read, so this connection cannot be reused
+            self.close_connection = True
+            self.send_json(413, {"status": "error", "error": f"body larger than {max_body} bytes"})
+            return None
+        return self.rfile.read(length)
+    
+    def reject_busy(self):
+        self.server.rejected += 1
+        self.send_json(503, {"status": "busy", "error": "detection queue is full"},
+                       {'Retry-After': str(self.server.retry_after)})
+    
+    def do_POST(self):
+        if self.path.rstrip('/').endswith('/batch'):
+            self.handle_batch()
+            return
+        
+        post_data = self.read_body(self.server.max_body)
+        if post_data is None:
+            return
+        
+        if self.server.is_saturated():
+            self.reject_busy()
+            return
+        
+        try:
+            data = json.loads(post_data.decode('utf-8'))
+            error = validate_detection(data)
+            if error:
+                raise ValueError(error)
+        except Exception as e:
+            print(f"Error processing request: {e}")
+            self.send_json(400, {"status": "error", "error": str(e)})
+            return
+        
+        if not self.server.on_detection(data):
+            self.reject_busy()
+            return
+        self.server.received += 1
+        self.send_json(200, {"status": "received"})
+    
+    def handle_batch(self):
+        """
+        POST .../batch: many detections in one request, acknowledged item by item
+        
+        Valid items are queued together in one call; each result carries the item's index (and its "id",
+        if the device sent one) so the device can drop exactly the acknowledged events from its buffer.
+        When the queue only has room for part of the batch, the rest are answered "busy" (with Retry-After)
+        and stay in the device's buffer.
+        """
+        post_data = self.read_body(self.server.max_batch_body)
+        if post_data is None:
+            return
+        
+        if self.server.is_saturated():
+            self.reject_busy()
+            return
+        
+        try:
+            items = parse_batch(post_data, self.headers.get('Content-Type', ''))
+        except Exception as e:
+            self.send_json(400, {"status": "error", "error": f"unreadable batch: {e}"})
+            return
+        if len(items) > self.server.max_batch_items:
+            self.send_json(413, {"status": "error", "error": f"more than {self.server.max_batch_items} items"})
+            return
+        
+        results = []
+        accepted = []
+        accepted_results = []
+        for index, (data, error) in enumerate(items):
+            error = error or validate_detection(data)
+            result = {"index": index, "status": "error" if error else "received"}
+            if isinstance(data, dict) and 'id' in data:
+                result['id'] = data['id']
+            if error:
+                result['error'] = error
+            else:
+                accepted.append(data)
+                accepted_results.append(result)
+            results.append(result)
+        
+        queued = len(accepted)
+        if accepted:
+            # on_batch returns True/False for the whole batch, or the number of leading items it queued
+            queued = self.server.on_batch(accepted)
+            if isinstance(queued, bool):
+                queued = len(accepted) if queued else 0
+            if queued == 0:
+                self.reject_busy()
+                return
+        
+        headers = None
+        for result in accepted_results[queued:]:
+            result['status'] = "busy"
+            result['error'] = "detection queue is full"
+        if queued < len(accepted):
+            headers = {'Retry-After': str(self.server.retry_after)}
+        
+        self.server.received += queued
+        self.send_json(200, {"status": "received", "received": queued, "busy": len(accepted) - queued,
+                             "errors": len(results) - len(accepted), "results": results}, headers)
+    
+    def log_message(self, format, *args):
+        pass  # Suppress server logs
+
+class IngestServer(HTTPServer):
+    def __init__(self, address, on_detection, is_saturated=None, max_workers=32, max_pending=64,
+                 max_body=64 * 1024, idle_timeout=15, retry_after=1, on_batch=None, max_batch_body=4 * 1024 * 1024,
+                 max_batch_items=5000, handler=SignalHandler):
+        """
+        HTTP server with a fixed pool of connection workers
+        
+        Each accepted connection is served by one worker for its keep-alive lifetime, so a slow or stalled
+        device only ties up its own worker. Connections beyond the pool wait in a bounded backlog; when that
+        is full they get an immediate 503 instead of queueing without limit.
+        
+        Args:
+            address: (host, port) to listen on
+            on_detection: Called with each detection dict; return False to reject it as busy
+            is_saturated: Returns True while the detection queue is too full to accept more (503 + Retry-After)
+            max_workers: Connections served concurrently
+            max_pending: Accepted connections waiting for a worker
+            max_body: Largest request body accepted (larger requests get 413)
+            idle_timeout: Seconds an idle keep-alive connection is kept open
+            retry_after: Retry-After seconds sent with 503 replies
+            on_batch: Called with the list of valid detections from one batch request; returns True/False for
+                the whole batch or the number of leading items queued (default: on_detection for each item)
+            max_batch_body: Largest batch request body accepted
+            max_batch_items: Most detections accepted in one batch request
+        """
+        super().__init__(address, handler)
+        self.on_detection = on_detection
+        self.is_saturated = is_saturated or (lambda: False)
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self.retry_after = retry_after
+        self.on_batch = on_batch or (lambda detections: all([on_detection(data) for data in detections]))
+        self.max_batch_body = max_batch_body
+        self.max_batch_items = max_batch_items
+        self.received = 0
+        self.rejected = 0
+        
+        self.connections = queue.Queue(maxsize=max_pending)
+        self.active = set()  # Connections being served, closed by stop() so workers exit promptly
+        self.active_lock = threading.Lock()
+        self.stopping = False
+        self.workers = [threading.Thread(target=self.worker, daemon=True) for _ in range(max_workers)]
+        for thread in self.workers:
+            thread.start()
+        self.serve_thread = None
+    
+    def process_request(self, request, client_address):
+        """Hand the connection to a worker (called by serve_forever)"""
+        try:
+            self.connections.put_nowait((request, client_address))
+        except queue.Full:
+            self.rejected += 1
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\n"
+                                b"Retry-After: " + str(self.retry_after).encode() + b"\r\n"
+                                b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+            except OSError:
+                pass
+            self.shutdown_request(request)
+    
+    def worker(self):
+        while True:
+            item = self.connections.get()
+            if item is None:
+                break
+            request, client_address = item
+            with self.active_lock:
+                if self.stopping:
+                    self.shutdown_request(request)
+                    continue
+                self.active.add(request)
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                if not self.stopping:  # Handlers fail on the sockets stop() closes under them
+                    self.handle_error(request, client_address)
+            finally:
+                with self.active_lock:
+                    self.active.discard(request)
+                self.shutdown_request(request)
+    
+    def start(self):
+        """Serve in a background thread"""
+        self.serve_thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.serve_thread.start()
+        return self
+    
+    def stop(self, timeout=5):
+        """Stop accepting, close connections still waiting for a worker, then stop and join the workers"""
+        if self.serve_thread is not None:
+            self.shutdown()
+        self.server_close()
+        
+        while True:
+            try:
+                item = self.connections.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self.shutdown_request(item[0])
+        
+        # Unblock workers waiting on keep-alive connections; their handlers then see end of stream
+        with self.active_lock:
+            self.stopping = True
+            for request in list(self.active):
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        
+        for _ in self.workers:
+            self.connections.put(None)
+        deadline = time.time() + timeout
+        for thread in self.workers:
+            thread.join(max(0, deadline - time.time()))
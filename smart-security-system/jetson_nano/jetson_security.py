@@ -11,6 +11,7 @@ import requests
 import json
 import time
 import threading
+import itertools
 from datetime import datetime
 import argparse
 import logging
@@ -21,7 +22,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 class JetsonSecuritySystem:
-    def __init__(self, server_url, confidence_threshold=0.5, person_class_id=0):
+    def __init__(self, server_url, confidence_threshold=0.5, person_class_id=0, batch_size=100, max_pending=1000):
         """
         Initialize Jetson Security System
         
@@ -29,12 +30,24 @@ class JetsonSecuritySystem:
             server_url: URL of the main security system (e.g., "http://192.168.1.100:8080")
             confidence_threshold: Minimum confidence for person detection
             person_class_id: YOLO class ID for person (0 = person)
+            batch_size: Most buffered alerts sent in one batch request
+            max_pending: Alerts kept while the main system is unreachable (oldest dropped first)
         """
         self.server_url = server_url
         self.confidence_threshold = confidence_threshold
         self.person_class_id = person_class_id
         self.last_detection_time = 0
         self.detection_cooldown = 3  # seconds between detections
+        self.session = requests.Session()  # Reuses one keep-alive connection to the main system
+        self.batch_url = server_url.rstrip('/') + '/batch'
+        self.batch_size = batch_size
+        
+        # Alerts not yet acknowledged by the main system (by id, oldest first), flushed in batches once it is reachable again
+        self.pending_alerts = {}
+        self.max_pending = max_pending
+        self.batch_supported = True  # Cleared when the main system answers batches without per-alert acks
+        self.alert_ids = itertools.count(1)
+        self.session_id = int(time.time())
         
         # Initialize camera
         self.camera = None
@@ -138,40 +151,107 @@ class JetsonSecuritySystem:
         """
         Send detection alert to main security system
         
+        The alert is buffered first; if the main system cannot be reached it is sent later, together with
+        any other buffered alerts, in one batch request.
+        
         Args:
             detection_type: "authorized" or "unauthorized"
             confidence: Detection confidence score
         """
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        data = {
+            'id': f"{self.session_id}-{next(self.alert_ids)}",
+            'person_type': detection_type,
+            'confidence': float(confidence),
+            'timestamp': timestamp,
+            'device': 'jetson_nano',
+            'location': 'main_entrance'  # Configure as needed
+        }
+        self.pending_alerts[data['id']] = data
+        if len(self.pending_alerts) > self.max_pending:
+            # Drop the oldest alert (dicts keep insertion order)
+            del self.pending_alerts[next(iter(self.pending_alerts))]
+        self.flush_alerts()
+    
+    def count_sent(self, data):
+        logger.info(f"Alert sent successfully: {data['person_type']} ({data['confidence']:.2f})")
+        self.total_detections += 1
+        if data['person_type'] == "authorized":
+            self.authorized_count += 1
+        else:
+            self.unauthorized_count += 1
+    
+    def flush_alerts(self):
+        """Send buffered alerts: a single alert as one POST, a backlog in batches with per-alert acks"""
         try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            data = {
-                'person_type': detection_type,
-                'confidence': float(confidence),
-                'timestamp': timestamp,
-                'device': 'jetson_nano',
-                'location': 'main_entrance'  # Configure as needed
-            }
-            
-            response = requests.post(
-                self.server_url,
-                json=data,
-                timeout=5,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Alert sent successfully: {detection_type} ({confidence:.2f})")
-                self.total_detections += 1
-                if detection_type == "authorized":
-                    self.authorized_count += 1
+            while self.pending_alerts:
+                if len(self.pending_alerts) == 1 or not self.batch_supported:
+                    data = next(iter(self.pending_alerts.values()))
+                    response = self.session.post(
+                        self.server_url,
+                        json=data,
+                        timeout=5,
+                        headers={'Content-Type': 'application/json'}
+                    )
+                    if response.status_code == 200:
+                        del self.pending_alerts[data['id']]
+                        self.count_sent(data)
+                        continue
+                    if response.status_code == 400:
+                        del self.pending_alerts[data['id']]
+                        logger.warning(f"Alert rejected by main system: {response.text}")
+                        continue
+                else:
+                    batch = list(itertools.islice(self.pending_alerts.values(), self.batch_size))
+                    response = self.session.post(
+                        self.batch_url,
+                        json=batch,
+                        timeout=10,
+                        headers={'Content-Type': 'application/json'}
+                    )
+                    if response.status_code == 200:
+                        # Every acknowledged alert (received or rejected as invalid) leaves the buffer;
+                        # "busy" alerts did not fit in the main system's queue and stay for the next flush
+                        try:
+                            results = response.json().get('results') or []
+                        except ValueError:
+                            results = []
+                        acked = 0
+                        busy = 0
+                        for result in results:
+                            if not isinstance(result, dict) or result.get('id') not in self.pending_alerts:
+                                continue
+                            if result.get('status') == 'busy':
+                                busy += 1
+                                continue
+                            data = self.pending_alerts.pop(result['id'])
+                            acked += 1
+                            if result.get('status') == 'received':
+                                self.count_sent(data)
+                            else:
+                                logger.warning(f"Alert {data['id']} rejected: {result.get('error')}")
+                        if acked == 0 and busy == 0:
+                            # A server without the batch endpoint answers 200 without acks; resending would loop forever
+                            logger.warning("Main system did not acknowledge the batch, sending alerts one at a time")
+                            self.batch_supported = False
+                            continue
+                        logger.info(f"Flushed {acked} buffered alerts ({len(self.pending_alerts)} still pending)")
+                        if busy:
+                            logger.warning(f"Main system busy, {busy} alerts of the batch kept for retry "
+                                           f"(retry after {response.headers.get('Retry-After', '?')}s)")
+                            break
+                        continue
+                
+                if response.status_code == 503:
+                    logger.warning(f"Main system busy, {len(self.pending_alerts)} alerts kept for retry "
+                                   f"(retry after {response.headers.get('Retry-After', '?')}s)")
                 else:
-                    self.unauthorized_count += 1
-            else:
-                logger.warning(f"Failed to send alert: HTTP {response.status_code}")
+                    logger.warning(f"Failed to send alert: HTTP {response.status_code}")
+                break
                 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Network error sending alert: {e}")
+            logger.error(f"Network error sending alert ({len(self.pending_alerts)} pending): {e}")
         except Exception as e:
             logger.error(f"Error sending detection alert: {e}")
     
@@ -295,6 +375,8 @@ class JetsonSecuritySystem:
         logger.info(f"  Total detections: {self.total_detections}")
         logger.info(f"  Authorized: {self.authorized_count}")
         logger.info(f"  Unauthorized: {self.unauthorized_count}")
+        if self.pending_alerts:
+            logger.warning(f"  Unsent alerts: {len(self.pending_alerts)}")
 
 def main():
     parser = argparse.ArgumentParser(description='Jetson Nano Security System')
@@ -303,13 +385,15 @@ def main():
     parser.add_argument('--confidence', type=float, default=0.5, help='Detection confidence threshold (default: 0.5)')
     parser.add_argument('--show-video', action='store_true', help='Show video output (for debugging)')
     parser.add_argument('--cooldown', type=int, default=3, help='Seconds between detections (default: 3)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Buffered alerts sent per batch request (default: 100)')
     
     args = parser.parse_args()
     
     # Create security system
     security_system = JetsonSecuritySystem(
         server_url=args.server,
-        confidence_threshold=args.confidence
+        confidence_threshold=args.confidence,
+        batch_size=args.batch_size
     )
     
     security_system.detection_cooldown = args.cooldown
@@ -0,0 +1,214 @@
+"""
+Detection Log Archive
+Rotates old detection records into gzip segments with a time index, and reads only the segments a query needs
+"""
+
+import os
+import json
+import gzip
+import time
+import threading
+from datetime import datetime, timedelta
+from log_store import record_matches
+
+class LogArchive:
+    def __init__(self, directory="detection_log_archive"):
+        """
+        Compressed JSON-lines segments plus an index of the time range each one covers
+        
+        Args:
+            directory: Where segment_NNNNNN.jsonl.gz files and index.json are kept
+        """
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock = threading.Lock()
+        self.cached = None  # (segment number, records) of the last segment read
+        os.makedirs(directory, exist_ok=True)
+        
+        self.segments = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                self.segments = json.load(f)
+    
+    def save_index(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.segments, f, indent=1)
+        os.replace(temp_path, self.index_path)
+    
+    def add_segment(self, records):
+        """Write records (oldest first) as a new compressed segment and index it"""
+        if not records:
+            return None
+        
+        with self.lock:
+            number = self.segments[-1]['segment'] + 1 if self.segments else 1
+            filename = f"segment_{number:06d}.jsonl.gz"
+            path = os.path.join(self.directory, filename)
+            with gzip.open(path + ".tmp", 'wt') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+            os.replace(path + ".tmp", path)
+            
+            timestamps = [record.get('timestamp') or "" for record in records]
+            entry = {
+                'segment': number,
+                'file': filename,
+                'first_timestamp': min(timestamps),
+                'last_timestamp': max(timestamps),
+                'records': len(records)
+            }
+            self.segments.append(entry)
+            self.save_index()
+        
+        print(f"🗜️ Archived {len(records)} detection log records to {filename}")
+        return entry
+    
+    def covering(self, start=None, end=None):
+        """Index entries of the segments that can hold records with start <= timestamp <= end"""
+        return [entry for entry in self.segments
+                if (start is None or entry['last_timestamp'] >= start)
+                and (end is None or entry['first_timestamp'] <= end)]
+    
+    def read_segment(self, entry):
+        """Load one segment; records get ids "segment:line" so they can be used as paging cursors"""
+        cached = self.cached
+        if cached is not None and cached[0] == entry['segment']:
+            return cached[1]
+        
+        records = []
+        with gzip.open(os.path.join(self.directory, entry['file']), 'rt') as f:
+            for line_number, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                record['id'] = f"{entry['segment']}:{line_number}"
+                records.append(record)
+        
+        self.cached = (entry['segment'], records)
+        return records
+    
+    def query(self, start=None, end=None, **filters):
+        """Return archived records with start <= timestamp <= end, oldest first, reading only covering segments"""
+        records = []
+        for entry in self.covering(start, end):
+            records.extend(record for record in self.read_segment(entry)
+                           if record_matches(record, filters, start, end))
+        return records
+    
+    def page_before(self, cursor, limit=100, **filters):
+        """Return up to limit archived records before cursor ("segment:line", None = newest), oldest first"""
+        segment, line = (None, None) if cursor is None else map(int, cursor.split(':'))
+        records = []
+        for entry in reversed(self.segments):
+            if segment is not None and entry['segment'] > segment:
+                continue
+            candidates = self.read_segment(entry)
+            if segment is not None and entry['segment'] == segment:
+                candidates = candidates[:line]
+            matching = [record for record in candidates if record_matches(record, filters)]
+            records = matching[-(limit - len(records)):] + records
+            if len(records) >= limit:
+                break
+        return records
+    
+    def page_after(self, cursor, limit=100, **filters):
+        """Return up to limit archived records after cursor ("segment:line", None = oldest), oldest first"""
+        segment, line = (None, None) if cursor is None else map(int, cursor.split(':'))
+        records = []
+        for entry in self.segments:
+            if segment is not None and entry['segment'] < segment:
+                continue
+            candidates = self.read_segment(entry)
+            if segment is not None and entry['segment'] == segment:
+                candidates = candidates[line + 1:]
+            records.extend(record for record in candidates if record_matches(record, filters))
+            if len(records) >= limit:
+                break
+        return records[:limit]
+    
+    def count(self, **filters):
+        if not any(filters.values()):
+            return sum(entry['records'] for entry in self.segments)
+        return len(self.query(**filters))
+
+class ArchivedLogStore:
+    def __init__(self, store, archive, max_bytes=5 * 1024 * 1024, max_records=100000, max_age_days=30,
+                 check_interval=60):
+        """
+        A log store whose old records are rotated into a LogArchive, read through one interface
+        
+        Args:
+            store: SQLiteLogStore or JsonlLogStore holding the recent records
+            archive: LogArchive for rotated records
+            max_bytes: JSON-lines file size that triggers rotation
+            max_records: Rows kept in the SQLite database before older ones are archived
+            max_age_days: Records older than this are archived (None = no age limit)
+            check_interval: Seconds between rotation checks
+        """
+        self.store = store
+        self.archive = archive
+        self.limits = {'max_bytes': max_bytes, 'max_records': max_records}
+        self.max_age_days = max_age_days
+        self.check_interval = check_interval
+        self.last_check = 0
+        self.rotate()
+    
+    def rotate(self):
+        """Archive whatever is over the size or age limits"""
+        self.last_check = time.time()
+        cutoff = None
+        if self.max_age_days is not None:
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            return self.store.rotate(self.archive, cutoff=cutoff, **self.limits)
+        except Exception as e:
+            print(f"Error rotating detection log: {e}")
+            return 0
+    
+    def append(self, record):
+        self.append_many([record])
+    
+    def append_many(self, records):
+        self.store.append_many(records)
+        if time.time() - self.last_check >= self.check_interval:
+            self.rotate()
+    
+    def set_durable_commits(self, durable):
+        self.store.set_durable_commits(durable)
+    
+    def sync(self):
+        self.store.sync()
+    
+    def latest(self, limit=100, **filters):
+        return self.page_before(None, limit, **filters)
+    
+    def page_before(self, cursor, limit=100, **filters):
+        """Page backwards through the live store, continuing into the archive"""
+        records = []
+        archive_cursor = cursor if isinstance(cursor, str) else None
+        if not isinstance(cursor, str):
+            records = self.store.page_before(cursor, limit, **filters)
+        if len(records) < limit:
+            records = self.archive.page_before(archive_cursor, limit - len(records), **filters) + records
+        return records
+    
+    def page_after(self, cursor, limit=100, **filters):
+        """Page forwards through the archive, continuing into the live store"""
+        if not isinstance(cursor, str):
+            return self.store.page_after(cursor, limit, **filters)
+        records = self.archive.page_after(cursor, limit, **filters)
+        if len(records) < limit:
+            records += self.store.page_after(None, limit - len(records), **filters)
+        return records
+    
+    def query(self, start=None, end=None, **filters):
+        """Return records with start <= timestamp <= end from the covering archive segments and the live store"""
+        return self.archive.query(start, end, **filters) + self.store.query(start, end, **filters)
+    
+    def count(self, **filters):
+        return self.archive.count(**filters) + self.store.count(**filters)
+    
+    def close(self):
+        self.store.close()
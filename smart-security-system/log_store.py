@@ -0,0 +1,487 @@
+"""
+Detection Log Store
+Indexed SQLite storage for detection events, with the legacy JSON-lines file behind the same interface
+"""
+
+import os
+import time
+import json
+import sqlite3
+import threading
+
+LOG_FIELDS = ('timestamp', 'person_type', 'person_name', 'confidence', 'source', 'device_id')
+FILTER_FIELDS = ('source', 'person_type', 'person_name')
+DURABILITY_POLICIES = ('event', 'group', 'periodic')
+
+def record_matches(record, filters, start=None, end=None):
+    """True if a record has the filtered field values and a timestamp within [start, end]"""
+    if not all(record.get(field) == filters[field] for field in FILTER_FIELDS if filters.get(field)):
+        return False
+    timestamp = record.get('timestamp') or ""
+    return (start is None or timestamp >= start) and (end is None or timestamp <= end)
+
+class SQLiteLogStore:
+    def __init__(self, path="detection_logs.db", import_from="detection_logs.json"):
+        """
+        Detection log in an SQLite database (WAL mode, indexed for paging and filtering)
+        
+        Args:
+            path: Database file
+            import_from: Legacy JSON-lines log imported once on first open (renamed to *.imported afterwards)
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.durable_commits = False
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS detections (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    person_type TEXT,
+                    person_name TEXT,
+                    confidence REAL,
+                    source TEXT,
+                    device_id TEXT
+                )""")
+            for field in ('timestamp',) + FILTER_FIELDS:
+                self.db.execute(f"CREATE INDEX IF NOT EXISTS idx_detections_{field} ON detections ({field})")
+        
+        if import_from and os.path.exists(import_from):
+            self.import_jsonl(import_from)
+    
+    def import_jsonl(self, path):
+        """Import a JSON-lines log in one transaction, then rename it so it is not imported twice"""
+        rows = []
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    rows.append(self.to_row(json.loads(line)))
+                except (ValueError, AttributeError):
+                    continue
+        
+        with self.lock, self.db:
+            self.db.executemany(f"INSERT INTO detections ({', '.join(LOG_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        os.replace(path, path + ".imported")
+        print(f"Imported {len(rows)} detection log entries from {path}")
+        return len(rows)
+    
+    def to_row(self, record):
+        return tuple(record.get(field) for field in LOG_FIELDS)
+    
+    def append(self, record):
+        """Store one detection record"""
+        self.append_many([record])
+    
+    def append_many(self, records):
+        """Store several detection records in one transaction"""
+        with self.lock, self.db:
+            self.db.executemany(f"INSERT INTO detections ({', '.join(LOG_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                                [self.to_row(record) for record in records])
+    
+    def set_durable_commits(self, durable):
+        """Sync the WAL on every commit (durable) or only at checkpoints (faster)"""
+        with self.lock:
+            self.db.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+            self.durable_commits = durable
+    
+    def sync(self):
+        """Make everything committed so far durable (already the case with durable commits)"""
+        with self.lock:
+            if not self.durable_commits:
+                self.db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def where(self, filters, conditions=None, params=None):
+        """Build a WHERE clause from equality filters plus extra conditions"""
+        conditions = list(conditions or [])
+        params = list(params or [])
+        for field in FILTER_FIELDS:
+            if filters.get(field):
+                conditions.append(f"{field} = ?")
+                params.append(filters[field])
+        clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return clause, params
+    
+    def select(self, clause, params, order, limit):
+        with self.lock:
+            rows = self.db.execute(f"SELECT id, {', '.join(LOG_FIELDS)} FROM detections {clause} "
+                                   f"ORDER BY id {order} LIMIT ?", params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+    
+    def latest(self, limit=100, **filters):
+        """Return the newest records, oldest first"""
+        return self.page_before(None, limit, **filters)
+    
+    def page_before(self, cursor, limit=100, **filters):
+        """Return up to limit records older than cursor (a record id), oldest first"""
+        conditions = ["id < ?"] if cursor is not None else []
+        clause, params = self.where(filters, conditions, [cursor] if cursor is not None else [])
+        return self.select(clause, params, "DESC", limit)[::-1]
+    
+    def page_after(self, cursor, limit=100, **filters):
+        """Return up to limit records newer than cursor (a record id; None = from the oldest), oldest first"""
+        conditions = ["id > ?"] if cursor is not None else []
+        clause, params = self.where(filters, conditions, [cursor] if cursor is not None else [])
+        return self.select(clause, params, "ASC", limit)
+    
+    def query(self, start=None, end=None, **filters):
+        """Return all records with start <= timestamp <= end (either may be None), oldest first"""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("timestamp <= ?")
+            params.append(end)
+        clause, params = self.where(filters, conditions, params)
+        return self.select(clause, params, "ASC", -1)
+    
+    def rotate(self, archive, max_records=None, cutoff=None, **limits):
+        """
+        Move old rows into a compressed archive segment
+        
+        Args:
+            archive: LogArchive receiving the rows
+            max_records: Row limit; once exceeded, all but the newest max_records // 2 rows are archived
+                (so each rotation writes one reasonably sized segment instead of trimming a row at a time)
+            cutoff: Timestamp string; rows logged before it are archived
+        
+        Returns:
+            Number of rows archived
+        """
+        conditions, params = [], []
+        with self.lock:
+            if max_records is not None:
+                over = self.db.execute("SELECT id FROM detections ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                       (max_records,)).fetchone()
+                if over is not None:
+                    row = self.db.execute("SELECT id FROM detections ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                          (max_records // 2,)).fetchone()
+                    conditions.append("id <= ?")
+                    params.append(row[0])
+            if cutoff is not None:
+                conditions.append("timestamp < ?")
+                params.append(cutoff)
+            if not conditions:
+                return 0
+            
+            clause = f"WHERE {' OR '.join(conditions)}"
+            rows = self.db.execute(f"SELECT {', '.join(LOG_FIELDS)} FROM detections {clause} ORDER BY id",
+                                   params).fetchall()
+            if not rows:
+                return 0
+            archive.add_segment([dict(row) for row in rows])
+            with self.db:
+                self.db.execute(f"DELETE FROM detections {clause}", params)
+        return len(rows)
+    
+    def count(self, **filters):
+        clause, params = self.where(filters)
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM detections {clause}", params).fetchone()[0]
+    
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+def read_lines_reverse(f, end, block_size=64 * 1024):
+    """
+    Yield (offset, line) for the lines of a binary file that end before byte offset end, last line first
+    
+    Reads fixed-size blocks backwards from end, so the cost depends on how many lines are
+    consumed rather than on the size of the file.
+    """
+    position = end
+    remainder = b""
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        f.seek(position)
+        block = f.read(size) + remainder
+        lines = block.split(b"\n")
+        remainder = lines[0]  # May continue in the previous block
+        
+        offsets = []
+        offset = position + len(lines[0]) + 1
+        for line in lines[1:]:
+            offsets.append(offset)
+            offset += len(line) + 1
+        for offset, line in zip(reversed(offsets), reversed(lines[1:])):
+            if line:
+                yield offset, line
+    
+    if remainder:
+        yield 0, remainder
+
+def parse_record(line, offset, filters):
+    """Decode one JSON log line; None if it is damaged or filtered out"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not record_matches(record, filters):
+        return None
+    record['id'] = offset
+    return record
+
+class LogFollower:
+    def __init__(self, path, offset=0):
+        """
+        Incrementally reads records appended to a JSON-lines log
+        
+        Args:
+            path: Log file
+            offset: Byte offset to start from; only bytes after it are ever read
+        """
+        self.path = path
+        self.offset = offset
+    
+    def poll(self, limit=None, **filters):
+        """
+        Parse the complete lines appended since the last poll
+        
+        A partly written last line is left for the next poll. If the file shrank (it was
+        replaced or truncated) reading starts again from the beginning.
+        """
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < self.offset:
+                self.offset = 0
+            f.seek(self.offset)
+            
+            while limit is None or len(records) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                record = parse_record(line, self.offset, filters)
+                self.offset += len(line)
+                if record is not None:
+                    records.append(record)
+        return records
+
+class JsonlLogStore:
+    def __init__(self, path="detection_logs.json"):
+        """Detection log kept as one JSON object per line (the original format); record ids are byte offsets"""
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None  # Append handle, kept open between writes
+    
+    def append(self, record):
+        self.append_many([record])
+    
+    def append_many(self, records):
+        """Write records with one write call; they are visible to readers but not necessarily on disk yet"""
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, 'a')
+            self.file.write(''.join(json.dumps(record) + '\n' for record in records))
+            self.file.flush()
+    
+    def set_durable_commits(self, durable):
+        pass
+    
+    def sync(self):
+        """fsync the appended records"""
+        with self.lock:
+            if self.file is not None:
+                os.fsync(self.file.fileno())
+    
+    def read_backwards(self, end, limit, **filters):
+        """Return up to limit records that start before byte offset end (None = end of file), oldest first"""
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        
+        with open(self.path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size if end is None else min(end, size)
+            for offset, line in read_lines_reverse(f, end):
+                record = parse_record(line, offset, filters)
+                if record is not None:
+                    records.append(record)
+                    if len(records) >= limit:
+                        break
+        return records[::-1]
+    
+    def latest(self, limit=100, **filters):
+        """Return the newest records, oldest first, reading only the end of the file"""
+        return self.read_backwards(None, limit, **filters)
+    
+    def page_before(self, cursor, limit=100, **filters):
+        """Return up to limit records before cursor (a record's byte offset), oldest first"""
+        return self.read_backwards(cursor, limit, **filters)
+    
+    def page_after(self, cursor, limit=100, **filters):
+        """Return up to limit records after cursor (a record's byte offset; None = from the start), oldest first"""
+        if not os.path.exists(self.path):
+            return []
+        start = 0
+        if cursor is not None:
+            with open(self.path, 'rb') as f:
+                f.seek(cursor)
+                start = cursor + len(f.readline())  # Skip the cursor record itself
+        return LogFollower(self.path, start).poll(limit, **filters)
+    
+    def query(self, start=None, end=None, **filters):
+        """Return all records with start <= timestamp <= end (either may be None), oldest first"""
+        return [record for record in LogFollower(self.path).poll(**filters)
+                if record_matches(record, {}, start, end)]
+    
+    def rotate(self, archive, max_bytes=None, cutoff=None, **limits):
+        """
+        Move the whole file into a compressed archive segment once it is too big or too old
+        
+        Args:
+            archive: LogArchive receiving the records
+            max_bytes: File size that triggers rotation
+            cutoff: Timestamp string; the file is rotated once its first record is older
+        
+        Returns:
+            Number of records archived
+        """
+        rotating = self.path + ".rotating"
+        with self.lock:
+            if not os.path.exists(rotating):
+                if not os.path.exists(self.path):
+                    return 0
+                size = os.path.getsize(self.path)
+                first = LogFollower(self.path).poll(1)
+                too_big = max_bytes is not None and size >= max_bytes
+                too_old = cutoff is not None and first and (first[0].get('timestamp') or "") < cutoff
+                if not (too_big or too_old):
+                    return 0
+                
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+                os.replace(self.path, rotating)
+            
+            # A .rotating file left by an interrupted rotation is archived here as well
+            records = LogFollower(rotating).poll()
+            for record in records:
+                del record['id']
+            archive.add_segment(records)
+            os.remove(rotating)
+        return len(records)
+    
+    def count(self, **filters):
+        return len(LogFollower(self.path).poll(**filters))
+    
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+class BufferedLogWriter:
+    def __init__(self, store, policy="group", batch_size=50, flush_interval=1.0, sync_interval=5.0):
+        """
+        Batches detection records in memory and writes them to a log store in the background
+        
+        Args:
+            store: SQLiteLogStore or JsonlLogStore
+            policy: "event" writes and syncs every record before append returns,
+                    "group" writes batches and syncs each batch (group commit),
+                    "periodic" writes batches and syncs at most every sync_interval seconds
+            batch_size: Pending records that trigger a write
+            flush_interval: Longest time a record waits in memory
+            sync_interval: Seconds between syncs with the "periodic" policy
+        """
+        if policy not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy: {policy}")
+        
+        self.store = store
+        self.policy = policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+        self.pending = []
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.last_sync = time.time()
+        self.written = 0
+        self.running = True
+        
+        store.set_durable_commits(policy != "periodic")
+        self.thread = None
+        if policy != "event":
+            self.thread = threading.Thread(target=self.worker, name="log-writer", daemon=True)
+            self.thread.start()
+    
+    def append(self, record):
+        """Queue a record (or write it immediately with the "event" policy)"""
+        if self.policy == "event":
+            self.write([record])
+            return
+        
+        with self.condition:
+            self.pending.append(record)
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+    
+    def write(self, batch):
+        with self.write_lock:
+            self.store.append_many(batch)
+            self.written += len(batch)
+            if self.policy != "periodic" or time.time() - self.last_sync >= self.sync_interval:
+                self.store.sync()
+                self.last_sync = time.time()
+    
+    def take_pending(self):
+        with self.condition:
+            batch, self.pending = self.pending, []
+        return batch
+    
+    def worker(self):
+        """Writer thread: write a batch when it is full or flush_interval has passed"""
+        while self.running:
+            with self.condition:
+                if len(self.pending) < self.batch_size:
+                    self.condition.wait(self.flush_interval)
+            batch = self.take_pending()
+            if batch:
+                try:
+                    self.write(batch)
+                except Exception as e:
+                    print(f"Error writing detection log: {e}")
+    
+    def flush(self):
+        """Write and sync everything pending now"""
+        batch = self.take_pending()
+        with self.write_lock:
+            if batch:
+                self.store.append_many(batch)
+                self.written += len(batch)
+            self.store.sync()
+            self.last_sync = time.time()
+    
+    def close(self):
+        """Stop the writer thread and flush what is still pending (call on shutdown)"""
+        self.running = False
+        with self.condition:
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(5)
+        self.flush()
+
+def open_log_store(backend="sqlite", archive_dir="detection_log_archive", **rotation):
+    """
+    Open the detection log: "sqlite" (default) or "jsonl" for the plain detection_logs.json file
+    
+    Args:
+        archive_dir: Directory for rotated, compressed log segments (None disables rotation)
+        rotation: Limits passed to ArchivedLogStore (max_bytes, max_records, max_age_days)
+    """
+    store = JsonlLogStore() if backend == "jsonl" else SQLiteLogStore()
+    if archive_dir is None:
+        return store
+    
+    from log_archive import LogArchive, ArchivedLogStore
+    return ArchivedLogStore(store, LogArchive(archive_dir), **rotation)
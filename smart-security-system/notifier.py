@@ -0,0 +1,363 @@
+"""
+Email Notifier
+Background email dispatcher with a persistent SMTP session, retries, and a local stand-in SMTP server for testing
+"""
+
+import os
+import time
+import heapq
+import queue
+import smtplib
+import argparse
+import threading
+import itertools
+import socketserver
+from email.mime.text import MIMEText
+
+class SMTPSession:
+    def __init__(self, host, port, username=None, password=None, timeout=30, health_check_after=30, require_tls=True):
+        """
+        One SMTP connection that is kept open and reused for many messages
+        
+        Args:
+            host, port: SMTP server address
+            username, password: Login credentials (login is skipped when the server does not offer AUTH)
+            timeout: Socket timeout in seconds
+            health_check_after: Idle seconds after which the connection is checked with NOOP before use
+            require_tls: Refuse to connect when the server does not offer STARTTLS (turn off only for the
+                         local stand-in server, which has no TLS)
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.require_tls = require_tls
+        self.smtp = None
+        self.last_used = 0
+    
+    def connect(self):
+        """Open the connection, upgrade to TLS and log in if the server offers AUTH"""
+        self.close()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if smtp.has_extn('starttls'):
+                smtp.starttls()
+                smtp.ehlo()
+            elif self.require_tls:
+                # A missing STARTTLS may have been stripped in transit; never send the password in cleartext
+                raise smtplib.SMTPNotSupportedError(f"{self.host}:{self.port} does not offer STARTTLS")
+            if self.username and self.password and smtp.has_extn('auth'):
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.smtp = smtp
+        self.last_used = time.time()
+        print(f"📡 SMTP session opened to {self.host}:{self.port}")
+    
+    def healthy(self):
+        """True if the connection is open and answers NOOP"""
+        if self.smtp is None:
+            return False
+        try:
+            return self.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+    
+    def send(self, msg):
+        """Send a message, reconnecting first if the session is closed or went stale while idle"""
+        if self.smtp is None:
+            self.connect()
+        elif time.time() - self.last_used > self.health_check_after and not self.healthy():
+            self.connect()
+        
+        self.smtp.send_message(msg)
+        self.last_used = time.time()
+    
+    def close(self):
+        """Close the connection (politely if possible)"""
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+        self.smtp = None
+
+# Errors that retrying the same message will not fix
+PERMANENT_ERRORS = (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                    smtplib.SMTPNotSupportedError)
+
+class EmailDispatcher:
+    def __init__(self, status_queue=None, max_attempts=4, backoff=5.0, maxsize=100, idle_timeout=120):
+        """
+        Worker thread that sends queued emails over a reused SMTP session
+        
+        Args:
+            status_queue: Queue that receives ('email_status', text) after each send or failure
+            max_attempts: Tries per message before giving up
+            backoff: Delay before the first retry; doubled after every failed attempt
+            maxsize: Messages allowed to wait; further messages are rejected instead of blocking the caller
+            idle_timeout: Seconds without mail after which the SMTP session is closed
+        """
+        self.status_queue = status_queue
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.jobs = queue.Queue(maxsize=maxsize)
+        self.retries = []  # Heap of (due time, order, job) waiting for another attempt
+        self.order = itertools.count()
+        self.session = None
+        self.session_key = None
+        self.sent = 0
+        self.failed = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.worker, name="email-dispatcher", daemon=True)
+        self.thread.start()
+    
+    def submit(self, settings, build_message, description="email"):
+        """
+        Queue an email
+        
+        Args:
+            settings: Dict with server, port, sender, password and optional require_tls (default True)
+            build_message: Callable returning the email.message.Message; runs on the dispatcher thread,
+                           so reading attachments does not block the caller
+            description: Short text used in status reports
+        
+        Returns:
+            False if the queue is full and the email was not queued
+        """
+        job = {'settings': settings, 'build': build_message, 'description': description,
+               'attempts': 0, 'message': None}
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self.report(f"Email queue full, dropped: {description}")
+            return False
+        return True
+    
+    def pending(self):
+        """Number of emails waiting to be sent or retried"""
+        return self.jobs.qsize() + len(self.retries)
+    
+    def report(self, text):
+        print(f"📧 {text}")
+        if self.status_queue is not None:
+            self.status_queue.put(('email_status', text))
+    
+    def worker(self):
+        """Dispatcher thread: send new and due retry jobs, close the session when idle"""
+        while self.running or not self.jobs.empty():
+            # Once stopping, only the queued jobs are sent; retries are no longer waited for
+            retrying = self.running and self.retries
+            timeout = self.idle_timeout
+            if retrying:
+                timeout = max(0, min(timeout, self.retries[0][0] - time.time()))
+            
+            if retrying and self.retries[0][0] <= time.time():
+                job = heapq.heappop(self.retries)[2]
+            else:
+                try:
+                    job = self.jobs.get(timeout=timeout)
+                except queue.Empty:
+                    if not self.retries and self.session is not None:
+                        self.session.close()
+                    continue
+                if job is None:
+                    continue
+            
+            self.attempt(job)
+        
+        # Pending retries are abandoned here, on the thread that owns the heap
+        if self.retries:
+            self.report(f"Email dispatcher stopped, {len(self.retries)} pending retries abandoned")
+            self.retries = []
+        if self.session is not None:
+            self.session.close()
+    
+    def get_session(self, settings):
+        """Reuse the open session unless the server or credentials changed"""
+        key = (settings['server'], int(settings['port']), settings.get('sender'), settings.get('password'),
+               settings.get('require_tls', True))
+        if self.session is None or self.session_key != key:
+            if self.session is not None:
+                self.session.close()
+            self.session = SMTPSession(key[0], key[1], key[2], key[3], require_tls=key[4])
+            self.session_key = key
+        return self.session
+    
+    def attempt(self, job):
+        """Try to send one job; schedule a retry with exponential backoff on transient errors"""
+        job['attempts'] += 1
+        try:
+            if job['message'] is None:
+                job['message'] = job['build']()
+        except Exception as e:
+            self.failed += 1
+            self.report(f"Email failed: could not build {job['description']}: {e}")
+            return
+        
+        try:
+            self.get_session(job['settings']).send(job['message'])
+            self.sent += 1
+            self.report(f"Email sent: {job['description']}")
+            return
+        except Exception as e:
+            error = e
+        
+        if self.session is not None:
+            self.session.close()
+        
+        if isinstance(error, PERMANENT_ERRORS) or job['attempts'] >= self.max_attempts:
+            self.failed += 1
+            self.report(f"Email failed: {job['description']}: {str(error)[:80]}")
+            return
+        
+        delay = self.backoff * 2 ** (job['attempts'] - 1)
+        heapq.heappush(self.retries, (time.time() + delay, next(self.order), job))
+        self.report(f"Email retry {job['attempts']}/{self.max_attempts - 1} in {delay:.0f}s: {error}")
+    
+    def stop(self, timeout=10):
+        """Send what is already queued (pending retries are abandoned), then stop the worker"""
+        self.running = False
+        try:
+            self.jobs.put_nowait(None)  # Wake the worker
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+class LocalSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP conversation: accepts every message, no TLS or AUTH"""
+    
+    def reply(self, text):
+        self.wfile.write((text + "\r\n").encode('ascii'))
+    
+    def handle(self):
+        self.reply("220 localhost stand-in SMTP ready")
+        sender = None
+        recipients = []
+        
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            
+            if verb == 'EHLO':
+                self.reply("250-localhost")
+                self.reply("250-8BITMIME")
+                self.reply(f"250 SIZE {self.server.max_size}")
+            elif verb == 'HELO':
+                self.reply("250 localhost")
+            elif verb == 'MAIL':
+                sender = command.partition(':')[2].strip().split(' ')[0]
+                recipients = []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                recipients.append(command.partition(':')[2].strip().split(' ')[0])
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"):
+                        break
+                    if data_line.startswith(b".."):
+                        data_line = data_line[1:]
+                    lines.append(data_line)
+                self.server.deliver(sender, recipients, b"".join(lines))
+                sender, recipients = None, []
+                self.reply("250 OK: queued")
+            elif verb == 'RSET':
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == 'NOOP':
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                break
+            else:
+                self.reply("502 Command not implemented")
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    
+    def __init__(self, address=("127.0.0.1", 1025), outbox=None, max_size=50 * 1024 * 1024):
+        """
+        Stand-in SMTP server for testing notifications without a real mail account
+        
+        Args:
+            address: (host, port) to listen on
+            outbox: Directory where received messages are saved as .eml files (None keeps nothing)
+            max_size: Message size advertised to clients
+        """
+        super().__init__(address, LocalSMTPHandler)
+        self.outbox = outbox
+        self.max_size = max_size
+        self.received = 0
+        self.lock = threading.Lock()
+        if outbox:
+            os.makedirs(outbox, exist_ok=True)
+    
+    def deliver(self, sender, recipients, data):
+        with self.lock:
+            self.received += 1
+            number = self.received
+        print(f"📨 Received message {number} from {sender} to {', '.join(recipients)} ({len(data)/1024:.1f}KB)")
+        if self.outbox:
+            with open(os.path.join(self.outbox, f"message_{number:05d}.eml"), 'wb') as f:
+                f.write(data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in SMTP server or send test emails through the dispatcher")
+    parser.add_argument("--serve-local", action="store_true", help="Run the stand-in SMTP server")
+    parser.add_argument("--host", default="127.0.0.1", help="SMTP host (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=1025, help="SMTP port (default: 1025)")
+    parser.add_argument("--outbox", default=None, help="Directory to save received messages (with --serve-local)")
+    parser.add_argument("--send-test", type=int, default=0, metavar="N", help="Send N test emails to the server")
+    parser.add_argument("--to", default="security@localhost", help="Recipient for test emails")
+    args = parser.parse_args()
+    
+    if args.serve_local:
+        server = LocalSMTPServer((args.host, args.port), args.outbox)
+        print(f"Stand-in SMTP server listening on {args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+    
+    if args.send_test:
+        status = queue.Queue()
+        dispatcher = EmailDispatcher(status)
+        # The stand-in server has no TLS, and no password is sent to it
+        settings = {'server': args.host, 'port': args.port, 'sender': "security-test@localhost", 'password': "",
+                    'require_tls': False}
+        
+        def build(number):
+            msg = MIMEText(f"Test message {number} from the security system email dispatcher")
+            msg['From'] = settings['sender']
+            msg['To'] = args.to
+            msg['Subject'] = f"Dispatcher test {number}"
+            return msg
+        
+        start = time.time()
+        for number in range(1, args.send_test + 1):
+            dispatcher.submit(settings, lambda number=number: build(number), f"test {number}")
+        dispatcher.stop(timeout=60)
+        elapsed = time.time() - start
+        print(f"Sent {dispatcher.sent}, failed {dispatcher.failed} in {elapsed:.2f}s")
+        return 0 if dispatcher.failed == 0 else 1
+    
+    parser.print_help()
+    return 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,313 @@
+"""
+Security Daemon
+Headless security system: Jetson listener, webcam recognition, evidence capture and notifications without a GUI
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import argparse
+import threading
+from evidence_writer import RecentIncidents
+from notifier import EmailDispatcher
+from alerts import AlertCoalescer
+from log_store import open_log_store, BufferedLogWriter
+from ingest_server import IngestServer
+from event_core import EventProcessor
+
+DEFAULT_CONFIG = {
+    'data_dir': ".",  # Logs, evidence and authorized faces are kept here (one directory per instance)
+    'server': {
+        'host': "0.0.0.0",
+        'port': 8080,
+        'workers': 32,
+        'max_body': 64 * 1024,
+        'queue_limit': 1000
+    },
+    'webcam': {
+        'enabled': False,
+        'camera_index': 0,
+        'authorized_faces_dir': "authorized_faces",
+        'detection_workers': 0,
+        'detection_scale': 0.25,
+        'detection_cooldown': 3,
+        'exact_decisions': True,  # False: faster for strangers in very large galleries, may miss enrolled people
+        'buffer_seconds': 10,
+        'clip_duration': 20,
+        'buffer_max_mb': 300,
+        'max_clip_seconds': 60,
+        'recording_fps': 15
+    },
+    'notifications': {
+        'notify_authorized': False,
+        'notify_unauthorized': True,
+        'alert_window': 30,
+        'attachment_limit_mb': 20
+    },
+    'email': {
+        'server': "smtp.gmail.com",
+        'port': 587,
+        'sender': "",
+        'password': "",
+        'recipient': "",
+        'require_tls': True
+    },
+    'log': {
+        'backend': "sqlite",
+        'durability': "group",
+        'rotate_mb': 5,
+        'max_records': 100000,
+        'max_age_days': 30
+    }
+}
+
+def load_config(path=None):
+    """
+    Read a JSON config file over the defaults (each section is merged key by key)
+    
+    Returns:
+        Complete config dict
+    """
+    config = {section: dict(values) if isinstance(values, dict) else values
+              for section, values in DEFAULT_CONFIG.items()}
+    if path:
+        with open(path, 'r') as f:
+            overrides = json.load(f)
+        for section, values in overrides.items():
+            if section not in config:
+                raise ValueError(f"Unknown config section: {section}")
+            if isinstance(config[section], dict):
+                unknown = set(values) - set(config[section])
+                if unknown:
+                    raise ValueError(f"Unknown {section} settings: {', '.join(sorted(unknown))}")
+                config[section].update(values)
+            else:
+                config[section] = values
+    return config
+
+class WebcamMonitor:
+    def __init__(self, settings, event_core):
+        """
+        Webcam capture and face recognition without rendering
+        
+        Args:
+            settings: The config's webcam section
+            event_core: EventProcessor receiving the detections
+        """
+        # Only imported when the webcam is enabled, so listener-only instances never load face_recognition or cv2
+        from face_cache import FaceEncodingCache, name_from_filename, encode_face_image
+        from identity_store import IdentityStore
+        from frame_buffer import FrameRingBuffer
+        from clip_recorder import ClipRecorder
+        from evidence_writer import EvidenceWriter
+        from evidence_capture import EvidenceCapture
+        from video_pipeline import DropOldestQueue
+        from webcam_detections import WebcamDetectionLogger
+        
+        self.settings = settings
+        self.event_core = event_core
+        self.video_cap = None
+        self.current_frame = None
+        self.is_running = False
+        self.threads = []
+        self.detection_queue = DropOldestQueue(maxsize=1)
+        
+        faces_dir = settings['authorized_faces_dir']
+        os.makedirs(faces_dir, exist_ok=True)
+        encodings, names = FaceEncodingCache(faces_dir).sync(encode_face_image, name_from_filename)
+        self.identity_store = IdentityStore(encodings, names, exact_decisions=settings['exact_decisions'])
+        print(f"Loaded {len(encodings)} authorized faces for {len(self.identity_store)} people")
+        
+        self.video_buffer = FrameRingBuffer(settings['buffer_seconds'], settings['buffer_max_mb'] * 1024 * 1024,
+                                            fps=settings['recording_fps'])
+        self.clip_recorder = ClipRecorder(self.video_buffer, settings['recording_fps'], settings['max_clip_seconds'])
+        self.evidence_writer = EvidenceWriter(event_core.events)
+        self.evidence_capture = EvidenceCapture(self.evidence_writer, self.clip_recorder, event_core,
+                                                settings['buffer_seconds'], settings['clip_duration'],
+                                                settings['recording_fps'], settings['detection_cooldown'])
+        self.detection_logger = WebcamDetectionLogger(self.evidence_capture, event_core, settings['detection_cooldown'])
+    
+    def start(self):
+        import cv2
+        camera_index = self.settings['camera_index']
+        self.video_cap = cv2.VideoCapture(camera_index)
+        if not self.video_cap.isOpened():
+            raise RuntimeError(f"Could not open camera {camera_index}")
+        self.video_cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        self.video_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        self.video_cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
+        self.is_running = True
+        self.threads = [
+            threading.Thread(target=self.capture_worker, daemon=True),
+            threading.Thread(target=self.detection_worker, daemon=True)
+        ]
+        for thread in self.threads:
+            thread.start()
+        print(f"Webcam {camera_index} started")
+    
+    def capture_worker(self):
+        """Reads frames into the pre-detection buffer and offers the newest one for detection"""
+        while self.is_running:
+            ret, frame = self.video_cap.read()
+            if not ret:
+                print("Failed to read frame from webcam")
+                break
+            timestamp = time.time()
+            self.current_frame = frame
+            self.video_buffer.write(frame, timestamp)
+            self.detection_queue.put({'frame': frame, 'timestamp': timestamp})
+        print("Webcam capture ended")
+    
+    def detection_worker(self):
+        from detection_backend import create_detection_backend
+        try:
+            backend = create_detection_backend(self.settings['detection_workers'], self.settings['detection_scale'])
+        except Exception as e:
+            print(f"Could not start detection backend: {e}")
+            return
+        
+        while self.is_running:
+            packet = self.detection_queue.get(timeout=0.01 if backend.in_flight() else 0.5)
+            try:
+                if packet is not None and self.detection_logger.cooldown_elapsed():
+                    backend.submit(packet['frame'], packet['timestamp'])
+                for timestamp, frame, face_locations, face_encodings in backend.collect(timeout=0.01):
+                    # Evidence shows the frame the faces were found in, not whatever was captured since
+                    self.detection_logger.log_matches(self.identity_store.match(face_encodings), frame)
+            except Exception as e:
+                print(f"Detection error: {e}")
+        
+        backend.close()
+    
+    def stop(self):
+        self.is_running = False
+        for thread in self.threads:
+            thread.join(timeout=5)
+        if self.video_cap:
+            self.video_cap.release()
+            self.video_cap = None
+        self.clip_recorder.stop()
+        self.evidence_writer.stop()
+
+class SecurityDaemon:
+    def __init__(self, config, verbose=False):
+        """
+        The detection, logging and notification pipeline of the GUI app, without tkinter or PIL
+        
+        Args:
+            config: Complete config dict (see load_config)
+            verbose: Print every processed detection
+        """
+        self.config = config
+        self.verbose = verbose
+        self.status = queue.Queue()  # Email and notification status lines, printed by run()
+        self.stopping = threading.Event()
+        
+        log = config['log']
+        self.log_store = open_log_store(log['backend'], max_bytes=log['rotate_mb'] * 1024 * 1024,
+                                        max_records=log['max_records'], max_age_days=log['max_age_days'])
+        self.log_writer = BufferedLogWriter(self.log_store, log['durability'])
+        
+        notifications = config['notifications']
+        self.email_dispatcher = EmailDispatcher(self.status)
+        self.event_core = EventProcessor(self.log_writer, self.email_dispatcher,
+                                         AlertCoalescer(notifications['alert_window']), RecentIncidents(),
+                                         notifications['attachment_limit_mb'],
+                                         maxsize=config['server']['queue_limit'])
+        self.event_core.update_settings(notify_authorized=notifications['notify_authorized'],
+                                        notify_unauthorized=notifications['notify_unauthorized'],
+                                        email=dict(config['email']))
+        self.event_core.subscribe(self.on_update)
+        
+        self.server = None
+        self.webcam = WebcamMonitor(config['webcam'], self.event_core) if config['webcam']['enabled'] else None
+    
+    def on_update(self, update_type, data):
+        if update_type == 'status':
+            self.status.put(('status', data))
+        elif update_type == 'detection_view' and self.verbose:
+            self.status.put(('detection', data['log_entry']))
+    
+    def start(self):
+        self.event_core.start()
+        
+        def accept_detection(data):
+            data['source'] = 'jetson'
+            return self.event_core.submit('detection', data)
+        
+        def accept_detections(detections):
+            for data in detections:
+                data['source'] = 'jetson'
+            return self.event_core.submit_batch(detections)  # Takes what fits under the queue limit
+        
+        server = self.config['server']
+        self.server = IngestServer((server['host'], server['port']), accept_detection, self.event_core.saturated,
+                                   max_workers=server['workers'], max_body=server['max_body'],
+                                   on_batch=accept_detections).start()
+        print(f"Server listening on http://{server['host']}:{server['port']}")
+        
+        if self.webcam:
+            self.webcam.start()
+    
+    def run(self):
+        """Start everything and print status lines until stop() is called (or SIGINT/SIGTERM)"""
+        self.start()
+        while not self.stopping.is_set():
+            try:
+                _, text = self.status.get(timeout=0.5)
+                print(text)
+            except queue.Empty:
+                pass
+        self.shutdown()
+    
+    def stop(self, *args):
+        self.stopping.set()
+    
+    def shutdown(self):
+        """Same order as the GUI: finish evidence, process queued events, send open incidents, close the log"""
+        if self.server:
+            self.server.stop()
+        if self.webcam:
+            self.webcam.stop()
+        self.event_core.stop()
+        self.email_dispatcher.stop()
+        self.log_writer.close()
+        self.log_store.close()
+        while not self.status.empty():
+            print(self.status.get_nowait()[1])
+        print(f"Processed {self.event_core.processed} detections")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the security system without a GUI')
+    parser.add_argument('--config', default=None, help='JSON config file (missing sections use the defaults)')
+    parser.add_argument('--print-config', action='store_true', help='Print the default config and exit')
+    parser.add_argument('--verbose', action='store_true', help='Print every processed detection')
+    
+    args = parser.parse_args()
+    
+    if args.print_config:
+        json.dump(DEFAULT_CONFIG, sys.stdout, indent=2)
+        print()
+        return 0
+    
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Could not load config: {e}")
+        return 1
+    
+    os.makedirs(config['data_dir'], exist_ok=True)
+    os.chdir(config['data_dir'])
+    
+    daemon = SecurityDaemon(config, verbose=args.verbose)
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,127 @@
+"""
+Video Pipeline
+Bounded queues and timing helpers for the capture / detect / render webcam stages
+"""
+
+import threading
+import time
+from collections import deque
+
+class DropOldestQueue:
+    def __init__(self, maxsize=1):
+        """
+        Bounded queue whose put never blocks: when full, the oldest item is discarded
+        
+        Args:
+            maxsize: Number of items kept; 1 means consumers only ever see the latest item
+        """
+        self.items = deque()
+        self.maxsize = maxsize
+        self.condition = threading.Condition()
+        self.dropped = 0
+    
+    def put(self, item):
+        """Add an item, dropping the oldest one if the queue is full"""
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+    
+    def get(self, timeout=None):
+        """Remove and return the oldest item, or None if nothing arrived within timeout"""
+        with self.condition:
+            if not self.items:
+                self.condition.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+    
+    def clear(self):
+        """Discard all queued items"""
+        with self.condition:
+            self.items.clear()
+    
+    def __len__(self):
+        return len(self.items)
+
+class FrameSlot:
+    def __init__(self):
+        """
+        Holds only the newest frame for display (latest frame wins)
+        
+        The producer replaces the frame whenever a new one is ready; the display takes it at its own
+        cadence, so frames it had no time to show are dropped instead of queueing up.
+        """
+        self.item = None
+        self.lock = threading.Lock()
+        self.published = 0
+        self.displayed = 0
+        self.dropped = 0  # Frames replaced before they were taken
+    
+    def put(self, item):
+        """Publish a frame, replacing one that has not been taken yet"""
+        with self.lock:
+            if self.item is not None:
+                self.dropped += 1
+            self.item = item
+            self.published += 1
+    
+    def take(self):
+        """Return the newest frame and empty the slot, or None if no new frame arrived since the last take"""
+        with self.lock:
+            item, self.item = self.item, None
+            if item is not None:
+                self.displayed += 1
+            return item
+    
+    def clear(self):
+        with self.lock:
+            self.item = None
+
+class StageStats:
+    def __init__(self, name, window=100):
+        """
+        Rolling latency and throughput measurements for one pipeline stage
+        
+        Args:
+            name: Stage name used in reports
+            window: Number of recent samples kept
+        """
+        self.name = name
+        self.latencies = deque(maxlen=window)
+        self.timestamps = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+    
+    def record(self, seconds):
+        """Record how long one item spent in this stage"""
+        with self.lock:
+            self.latencies.append(seconds)
+            self.timestamps.append(time.time())
+            self.count += 1
+    
+    def snapshot(self):
+        """Return a dict with count, mean/max latency (ms) and recent throughput (items/s)"""
+        with self.lock:
+            latencies = list(self.latencies)
+            timestamps = list(self.timestamps)
+            count = self.count
+        
+        if not latencies:
+            return {'name': self.name, 'count': count, 'mean_ms': 0.0, 'max_ms': 0.0, 'fps': 0.0}
+        
+        elapsed = timestamps[-1] - timestamps[0]
+        return {
+            'name': self.name,
+            'count': count,
+            'mean_ms': sum(latencies) / len(latencies) * 1000,
+            'max_ms': max(latencies) * 1000,
+            'fps': (len(timestamps) - 1) / elapsed if elapsed > 0 else 0.0
+        }
+    
+    def summary(self):
+        """One-line human readable summary"""
+        stats = self.snapshot()
+        return f"{stats['name']}: {stats['fps']:.1f} fps, {stats['mean_ms']:.0f} ms avg"
@@ -0,0 +1,58 @@
+"""
+Webcam Detection Logging
+Cooldown, incident ids, evidence capture and event submission for webcam face matches, shared by the GUI and the daemon
+"""
+
+import time
+import itertools
+from datetime import datetime
+
+class WebcamDetectionLogger:
+    def __init__(self, evidence_capture, event_core, cooldown=3):
+        """
+        Turns face matches into detection events, at most one per cooldown period
+        
+        Args:
+            evidence_capture: EvidenceCapture that records photo, clip and summary for unauthorized people
+            event_core: EventProcessor receiving the detections
+            cooldown: Seconds between logged detections
+        """
+        self.evidence_capture = evidence_capture
+        self.event_core = event_core
+        self.cooldown = cooldown
+        self.last_detection_time = 0
+        self.incident_ids = itertools.count(1)
+    
+    def cooldown_elapsed(self):
+        """Only process every few seconds for performance"""
+        return time.time() - self.last_detection_time >= self.cooldown
+    
+    def log_matches(self, matches, frame):
+        """
+        Log the matches of one frame while the cooldown allows
+        
+        Args:
+            matches: FaceMatch list from the identity store
+            frame: The captured frame the faces were found in (used as evidence, never modified)
+        """
+        for match in matches:
+            if self.cooldown_elapsed():
+                self.log_detection(match.name, match.name != "Unknown", match.confidence, frame)
+                self.last_detection_time = time.time()
+    
+    def log_detection(self, person_name, is_authorized, confidence, frame):
+        """Log a detection event, starting its video and photo capture first if the person is unauthorized"""
+        detection_data = {
+            'person_type': "authorized" if is_authorized else "unauthorized",
+            'person_name': person_name,
+            'confidence': confidence,
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'source': 'webcam',
+            'incident_id': f"webcam_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{next(self.incident_ids)}"
+        }
+        
+        if not is_authorized and frame is not None:
+            self.evidence_capture.capture(detection_data, frame)
+        
+        if not self.event_core.submit('detection', detection_data):
+            print("⚠️ Event queue full, webcam detection dropped")
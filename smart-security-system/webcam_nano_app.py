@@ -2,25 +2,26 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog, simpledialog
 import threading
 import time
-import json
 import requests
 from datetime import datetime, timedelta
 import cv2
 from PIL import Image, ImageTk
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import socketserver
 import queue
-import base64
-import io
 import os
-import numpy as np
-from collections import deque
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email.mime.image import MIMEImage
-from email import encoders
+from face_cache import FaceEncodingCache, name_from_filename, encode_face_image
+from identity_store import IdentityStore
+from video_pipeline import DropOldestQueue, FrameSlot, StageStats
+from detection_backend import create_detection_backend
+from frame_buffer import FrameRingBuffer
+from clip_recorder import ClipRecorder
+from evidence_writer import EvidenceWriter, RecentIncidents
+from notifier import EmailDispatcher
+from alerts import AlertCoalescer
+from log_store import open_log_store, BufferedLogWriter
+from ingest_server import IngestServer
+from event_core import EventProcessor
+from evidence_capture import EvidenceCapture
+from webcam_detections import WebcamDetectionLogger
 
 # Try to import face_recognition, install if not available
 try:
@@ -43,7 +44,9 @@ class UnifiedSecurityApp:
         
         # Server for receiving Jetson Nano signals
         self.server = None
-        self.server_thread = None
+        self.ingest_workers = 32  # Jetson connections served at once
+        self.ingest_max_body = 64 * 1024  # Largest accepted request body in bytes
+        self.ingest_queue_limit = 1000  # Queued detection events above which devices are told to retry later
         
         # Mode selection
         self.current_mode = tk.StringVar(value="jetson")  # "jetson" or "webcam"
@@ -54,21 +57,79 @@ class UnifiedSecurityApp:
         self.is_streaming = False
         self.current_frame = None
         
+        # Webcam pipeline: capture -> detection (latest frame only) -> render
+        self.detection_queue = DropOldestQueue(maxsize=1)
+        self.render_queue = DropOldestQueue(maxsize=2)
+        self.frame_slot = FrameSlot()  # Newest rendered frame; the GUI shows it at its own cadence
+        self.display_interval_ms = 33
+        self.latest_detections = (0, [])  # (timestamp, faces) from the most recent detection pass
+        self.overlay_seconds = 1.0  # How long face boxes stay on screen after a detection
+        self.pipeline_threads = []
+        self.detection_backend = None
+        self.detection_workers = 0
+        self.detection_scale = 0.25  # Frames are downscaled before face detection
+        self.stage_stats = {
+            'capture': StageStats('Capture'),
+            'detect': StageStats('Detect'),
+            'render': StageStats('Render'),
+            'display': StageStats('Display')  # Capture to on-screen latency
+        }
+        
         # Face recognition variables (for webcam mode)
         self.known_face_encodings = []
         self.known_face_names = []
         self.authorized_faces_dir = "authorized_faces"
+        self.face_cache = None
+        self.identity_store = IdentityStore([], [])
+        self.gallery_lock = threading.Lock()  # Serializes changes to the face cache
+        self.face_index_min_size = 10000  # Use the approximate index for galleries at least this large
+        self.face_index_nprobe = 8  # Index partitions probed per frame (higher = better recall, slower)
+        self.face_index_exact = True  # False skips the full check for unmatched faces: faster, but may miss enrolled people
         
         # Detection settings
         self.detection_enabled = False
-        self.last_detection_time = 0
         self.detection_cooldown = 3  # seconds
         
         # Local video capture system
-        self.video_buffer = deque(maxlen=150)  # 10 seconds at 15fps
         self.buffer_seconds = 10
         self.clip_duration = 20
-        self.recording_fps = 15
+        self.recording_fps = 15  # Only used until the real capture rate has been measured
+        self.buffer_max_mb = 300  # Upper limit for the pre-detection buffer (sized from buffer_seconds x capture fps)
+        self.video_buffer = FrameRingBuffer(self.buffer_seconds, self.buffer_max_mb * 1024 * 1024,
+                                            fps=self.recording_fps)
+        self.max_clip_seconds = 60  # Repeated detections extend a clip up to this length
+        self.clip_recorder = ClipRecorder(self.video_buffer, self.recording_fps, self.max_clip_seconds)
+        self.recent_incidents = RecentIncidents()  # Evidence paths of recent detections, by incident id
+        
+        # Emails are sent from a worker thread over a reused SMTP session
+        self.email_dispatcher = EmailDispatcher(self.message_queue)
+        self.email_attachment_limit_mb = 20  # Encoded attachments per email; larger clips are sent as a preview
+        self.alert_window = 30  # Detections of the same person within this many seconds share one email
+        self.alert_coalescer = AlertCoalescer(self.alert_window)
+        
+        # Detection log storage ("sqlite" or "jsonl"); the logs tab pages through it
+        self.log_backend = "sqlite"
+        self.log_rotate_mb = 5  # JSON-lines file size that starts a new archive segment
+        self.log_max_records = 100000  # SQLite rows kept before older ones are archived
+        self.log_max_age_days = 30  # Older records move to detection_log_archive
+        self.log_store = open_log_store(self.log_backend, max_bytes=self.log_rotate_mb * 1024 * 1024,
+                                        max_records=self.log_max_records, max_age_days=self.log_max_age_days)
+        self.log_durability = "group"  # "event", "group" (sync each batch) or "periodic"
+        self.log_writer = BufferedLogWriter(self.log_store, self.log_durability)
+        
+        # Detection events are processed on the event core's thread; the GUI only renders its updates
+        self.event_core = EventProcessor(self.log_writer, self.email_dispatcher, self.alert_coalescer,
+                                         self.recent_incidents, self.email_attachment_limit_mb,
+                                         maxsize=self.ingest_queue_limit)
+        self.event_core.subscribe(lambda update_type, data: self.message_queue.put((update_type, data)))
+        self.evidence_writer = EvidenceWriter(self.event_core.events)  # Saves photos and summaries in the background
+        self.evidence_capture = EvidenceCapture(self.evidence_writer, self.clip_recorder, self.event_core,
+                                                self.buffer_seconds, self.clip_duration, self.recording_fps,
+                                                self.detection_cooldown)
+        self.detection_logger = WebcamDetectionLogger(self.evidence_capture, self.event_core, self.detection_cooldown)
+        self.logs_page = []
+        self.logs_page_size = 100
+        self.logs_at_latest = False  # True while the newest page is displayed, so refresh can be incremental
         
         # Create authorized faces directory
         if not os.path.exists(self.authorized_faces_dir):
@@ -81,11 +142,21 @@ class UnifiedSecurityApp:
         # Create GUI
         self.create_gui()
         
+        # Keep the event core's notification settings in step with the settings tab
+        self.sync_event_settings()
+        for var in (self.notify_authorized, self.notify_unauthorized, self.smtp_server_var, self.smtp_port_var,
+                    self.sender_email_var, self.sender_password_var, self.recipient_email_var,
+                    self.smtp_require_tls_var):
+            var.trace_add('write', self.sync_event_settings)
+        self.cooldown_var.trace_add('write', self.sync_detection_cooldown)
+        self.event_core.start()
+        
         # Start server for Jetson Nano mode
         self.start_server()
         
-        # Start message processing
+        # Start message processing and the video display loop
         self.process_messages()
+        self.display_frame()
         
         # Handle window close
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -93,15 +164,24 @@ class UnifiedSecurityApp:
     def on_closing(self):
         """Handle application closing"""
         try:
+            # Stop accepting Jetson detections first, so nothing is acknowledged after the event core has drained
+            if self.server:
+                self.server.stop()
+            
             # Stop webcam if running
             if self.is_streaming:
                 self.stop_webcam()
             
-            # Stop server if running
-            if self.server:
-                self.server.shutdown()
-                self.server.socket.close()
-                
+            # Finalize any clip that is still recording, then flush the queued evidence
+            self.clip_recorder.stop()
+            self.evidence_writer.stop()
+            
+            # Process the queued events and send the incidents that are still collecting detections
+            self.event_core.stop()
+            self.email_dispatcher.stop()
+            self.log_writer.close()
+            self.log_store.close()
+            
             self.root.destroy()
         except Exception as e:
             print(f"Error during cleanup: {e}")
@@ -117,28 +197,54 @@ class UnifiedSecurityApp:
         
         if not os.path.exists(self.authorized_faces_dir):
             return
-            
-        for filename in os.listdir(self.authorized_faces_dir):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                path = os.path.join(self.authorized_faces_dir, filename)
-                name = os.path.splitext(filename)[0].split('_')[0]  # Get name before timestamp
-                
+        
+        if self.face_cache is None:
+            self.face_cache = FaceEncodingCache(self.authorized_faces_dir)
+        
+        # Only new or changed images are encoded, everything else comes from the cache
+        self.known_face_encodings, self.known_face_names = self.face_cache.sync(
+            encode_face_image, name_from_filename)
+        
+        self.identity_store = self.build_identity_store(self.known_face_encodings, self.known_face_names)
+        
+        print(f"Loaded {len(self.known_face_encodings)} authorized faces for {len(self.identity_store)} people")
+    
+    def build_identity_store(self, encodings, names):
+        """Group the photos by person: centroid plus a few exemplars per identity"""
+        return IdentityStore(encodings, names,
+                             index_min_size=self.face_index_min_size,
+                             nprobe=self.face_index_nprobe,
+                             exact_decisions=self.face_index_exact)
+    
+    def update_gallery(self, change):
+        """Apply a face cache change in the background, then swap in the new identities"""
+        def worker():
+            with self.gallery_lock:
                 try:
-                    # Load image and get face encoding
-                    image = face_recognition.load_image_file(path)
-                    encodings = face_recognition.face_encodings(image)
+                    message = change()
+                    encodings = self.face_cache.matrix
+                    names = self.face_cache.names()
+                    identity_store = self.build_identity_store(encodings, names)
                     
-                    if encodings:
-                        self.known_face_encodings.append(encodings[0])
-                        self.known_face_names.append(name)
-                        print(f"Loaded authorized face: {name}")
-                    else:
-                        print(f"No face found in {filename}")
-                        
+                    # Single reference swap: the webcam thread sees either the old or the new gallery, never a partial one
+                    self.identity_store = identity_store
+                    self.known_face_encodings, self.known_face_names = encodings, names
                 except Exception as e:
-                    print(f"Error loading {filename}: {e}")
+                    message = f"Error updating faces: {e}"
+                    print(message)
+            
+            self.message_queue.put(('faces_updated', message))
         
-        print(f"Loaded {len(self.known_face_encodings)} authorized faces")
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def enroll_face_file(self, filename):
+        """Encode only the newly saved image and add it to the gallery"""
+        def change():
+            if self.face_cache.add_file(filename, encode_face_image, name_from_filename):
+                return f"Added {name_from_filename(filename)} to authorized faces"
+            return f"No face found in {filename}"
+        
+        self.update_gallery(change)
     
     def create_gui(self):
         """Create the main GUI interface"""
@@ -239,6 +345,11 @@ class UnifiedSecurityApp:
         self.test_btn = ttk.Button(status_frame, text="Test Detection", 
                                  command=self.test_detection)
         self.test_btn.pack(side=tk.LEFT, padx=10)
+        
+        # Pipeline stage timings (webcam mode)
+        self.pipeline_stats_var = tk.StringVar(value="")
+        ttk.Label(self.stream_frame, textvariable=self.pipeline_stats_var, 
+                 foreground="gray").pack(pady=2)
     
     def create_faces_tab(self):
         """Create face management interface (webcam mode only)"""
@@ -257,13 +368,13 @@ class UnifiedSecurityApp:
         
         ttk.Button(face_controls, text="Add Face from File", 
                   command=self.add_authorized_face).pack(side=tk.LEFT, padx=5)
-        ttk.Button(face_controls, text="Remove Selected Face", 
+        ttk.Button(face_controls, text="Remove Selected Person", 
                   command=self.remove_authorized_face).pack(side=tk.LEFT, padx=5)
         ttk.Button(face_controls, text="Reload All Faces", 
                   command=self.reload_faces).pack(side=tk.LEFT, padx=5)
         
         # Current faces list
-        faces_label = ttk.Label(self.faces_frame, text="Authorized Faces:")
+        faces_label = ttk.Label(self.faces_frame, text="Authorized People:")
         faces_label.pack(pady=(20, 5))
         
         self.faces_listbox = tk.Listbox(self.faces_frame, height=8)
@@ -302,8 +413,12 @@ Quick Setup for Webcam Testing:
         logs_controls = ttk.Frame(self.logs_frame)
         logs_controls.pack(pady=5)
         
+        ttk.Button(logs_controls, text="◀ Older", 
+                  command=self.older_logs).pack(side=tk.LEFT, padx=5)
         ttk.Button(logs_controls, text="Refresh Logs", 
                   command=self.refresh_logs).pack(side=tk.LEFT, padx=5)
+        ttk.Button(logs_controls, text="Newer ▶", 
+                  command=self.newer_logs).pack(side=tk.LEFT, padx=5)
         ttk.Button(logs_controls, text="Clear Logs", 
                   command=self.clear_logs).pack(side=tk.LEFT, padx=5)
         ttk.Button(logs_controls, text="Export Logs", 
@@ -361,6 +476,10 @@ Instructions for Jetson setup:
         self.cooldown_var = tk.StringVar(value="3")
         ttk.Entry(camera_frame, textvariable=self.cooldown_var, width=10).pack(anchor=tk.W, padx=5, pady=2)
         
+        ttk.Label(camera_frame, text="Detection Worker Processes (0 = run in the webcam thread):").pack(anchor=tk.W, padx=5, pady=2)
+        self.detection_workers_var = tk.StringVar(value=str(max(1, (os.cpu_count() or 2) - 1)))
+        ttk.Entry(camera_frame, textvariable=self.detection_workers_var, width=10).pack(anchor=tk.W, padx=5, pady=2)
+        
         # Test webcam button
         ttk.Button(camera_frame, text="Test Webcam", command=self.test_webcam).pack(anchor=tk.W, padx=5, pady=5)
         
@@ -395,6 +514,7 @@ Instructions for Jetson setup:
         self.smtp_port_var = tk.StringVar(value="587")
         self.sender_email_var = tk.StringVar(value="jherr116@ucr.edu")  # ← CHANGE THIS
         self.sender_password_var = tk.StringVar(value="vjwl aedz srfy tfmx")        # ← CHANGE THIS
+        self.smtp_require_tls_var = tk.BooleanVar(value=True)  # False only for the local stand-in SMTP server
         
         # Email help
         help_text = ttk.Label(email_frame, 
@@ -414,6 +534,10 @@ Instructions for Jetson setup:
         ttk.Checkbutton(notif_frame, text="Notify on Unauthorized Person", 
                        variable=self.notify_unauthorized).pack(anchor=tk.W, padx=5, pady=2)
         
+        ttk.Label(notif_frame, text="Group detections of the same person into one email within (seconds, 0 = off):").pack(anchor=tk.W, padx=5, pady=2)
+        self.alert_window_var = tk.StringVar(value=str(self.alert_window))
+        ttk.Entry(notif_frame, textvariable=self.alert_window_var, width=10).pack(anchor=tk.W, padx=5, pady=2)
+        
         # Save settings button
         ttk.Button(self.settings_frame, text="Save Settings", 
                   command=self.save_settings).pack(pady=20)
@@ -446,7 +570,7 @@ Instructions for Jetson setup:
             cutoff_date = datetime.now() - timedelta(days=days_to_keep)
             
             # Directories to clean
-            directories = ["security_clips", "security_photos", "security_logs"]
+            directories = ["security_clips", os.path.join("security_clips", "previews"), "security_photos", "security_logs"]
             total_removed = 0
             
             for directory in directories:
@@ -496,12 +620,15 @@ Instructions for Jetson setup:
     def test_email(self):
         """Test email configuration"""
         try:
-            self.send_email_notification(
+            self.sync_event_settings()
+            queued = self.event_core.send_email_notification(
                 "Test Alert", 
                 "This is a test email from your security system.", 
                 "test"
             )
-            messagebox.showinfo("Email Test", "Test email sent successfully!")
+            if not queued:
+                raise Exception("The email could not be queued; see the status bar for details")
+            messagebox.showinfo("Email Test", "Test email queued. The result will appear in the status bar.")
         except Exception as e:
             messagebox.showerror("Email Test Failed", f"Failed to send test email:\n{str(e)}")
     
@@ -681,9 +808,25 @@ Instructions for Jetson setup:
             self.is_streaming = True
             self.stream_btn.config(text="Stop Webcam")
             
-            # Start video thread
+            try:
+                self.detection_workers = int(self.detection_workers_var.get())
+            except ValueError:
+                self.detection_workers = 0
+            
+            # Start pipeline threads: capture feeds detection and render through drop-oldest queues
+            self.detection_queue.clear()
+            self.render_queue.clear()
+            self.frame_slot.clear()
+            self.video_buffer.clear()
+            self.latest_detections = (0, [])
             self.video_thread = threading.Thread(target=self.webcam_worker, daemon=True)
-            self.video_thread.start()
+            self.pipeline_threads = [
+                self.video_thread,
+                threading.Thread(target=self.detection_worker, daemon=True),
+                threading.Thread(target=self.render_worker, daemon=True)
+            ]
+            for thread in self.pipeline_threads:
+                thread.start()
             
             self.status_var.set("Webcam started - Ready for detection")
             print("Webcam thread started successfully")
@@ -706,12 +849,17 @@ Instructions for Jetson setup:
             self.video_cap.release()
             self.video_cap = None
         
+        # No more frames are coming, so close the current clip now
+        self.clip_recorder.stop()
+        
         self.stream_btn.config(text="Start Webcam")
         self.detection_btn.config(text="Enable Detection")
         self.detection_status.config(text="No Detection", background="gray")
         self.status_var.set("Webcam stopped")
+        self.pipeline_stats_var.set("")
         
         # Clear video display
+        self.frame_slot.clear()
         self.video_label.config(image="", text="Webcam feed will appear here")
         if hasattr(self.video_label, 'image'):
             delattr(self.video_label, 'image')
@@ -741,41 +889,28 @@ Instructions for Jetson setup:
             self.status_var.set("Face detection disabled")
     
     def webcam_worker(self):
-        """Webcam processing worker thread"""
+        """Webcam capture thread: reads frames and hands them to the detection and render stages"""
         while self.is_streaming and self.video_cap:
             try:
+                read_start = time.time()
                 ret, frame = self.video_cap.read()
                 if not ret:
                     print("Failed to read frame from webcam")
                     break
                 
-                # Store current frame for capture
-                self.current_frame = frame.copy()
-                
-                # Add frame to buffer for video recording
+                # cap.read() returns a new array every time, so the frame can be shared without copying
                 timestamp = time.time()
-                self.video_buffer.append({
-                    'frame': frame.copy(),
-                    'timestamp': timestamp
-                })
-                
-                # Process frame for face detection if enabled
-                if self.detection_enabled and FACE_RECOGNITION_AVAILABLE:
-                    frame = self.process_frame_for_detection(frame)
+                self.current_frame = frame
                 
-                # Convert frame to display format
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                image = Image.fromarray(frame_rgb)
-                
-                # Resize to fit display
-                image = image.resize((640, 480), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(image)
+                # Copy frame into the preallocated ring buffer for video recording
+                self.video_buffer.write(frame, timestamp)
                 
-                # Update GUI in main thread
-                self.message_queue.put(('video_frame', photo))
+                packet = {'frame': frame, 'timestamp': timestamp}
+                if self.detection_enabled and FACE_RECOGNITION_AVAILABLE:
+                    self.detection_queue.put(packet)
+                self.render_queue.put(packet)
                 
-                # Control frame rate
-                time.sleep(0.033)  # ~30 FPS
+                self.stage_stats['capture'].record(timestamp - read_start)
                 
             except Exception as e:
                 print(f"Webcam error: {e}")
@@ -783,288 +918,123 @@ Instructions for Jetson setup:
         
         print("Webcam worker thread ended")
     
-    def process_frame_for_detection(self, frame):
-        """Process frame for face detection and recognition"""
-        if not FACE_RECOGNITION_AVAILABLE:
-            return frame
-            
-        # Only process every few frames for performance
-        current_time = time.time()
-        if current_time - self.last_detection_time < float(self.cooldown_var.get()):
-            return frame
-        
-        # Resize frame for faster processing
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-        
-        # Find faces in frame
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
-        
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-            # Scale back up face locations since the frame was scaled to 1/4 size
-            top *= 4
-            right *= 4
-            bottom *= 4
-            left *= 4
-            
-            # Compare with known faces
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-            name = "Unknown"
-            confidence = 0
-            
-            if True in matches:
-                # Calculate distances to find best match
-                face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = self.known_face_names[best_match_index]
-                    confidence = 1 - face_distances[best_match_index]
-            
-            # Determine if authorized
-            is_authorized = name != "Unknown"
-            
-            # Draw rectangle and label
-            color = (0, 255, 0) if is_authorized else (0, 0, 255)
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-            
-            label = f"{name} ({'Authorized' if is_authorized else 'Unauthorized'})"
-            cv2.putText(frame, label, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    def detection_worker(self):
+        """Detection thread: feeds the newest frames to the detection backend and handles results in frame order"""
+        try:
+            backend = create_detection_backend(self.detection_workers, self.detection_scale)
+        except Exception as e:
+            print(f"Could not start detection backend: {e}")
+            return
+        self.detection_backend = backend
+        
+        while self.is_streaming:
+            # Poll quickly while worker processes have frames in flight
+            packet = self.detection_queue.get(timeout=0.01 if backend.in_flight() else 0.5)
             
-            # Log detection
-            if current_time - self.last_detection_time >= float(self.cooldown_var.get()):
-                self.log_detection(name, is_authorized, confidence)
-                self.last_detection_time = current_time
+            try:
+                if packet is not None and self.detection_enabled and self.detection_logger.cooldown_elapsed():
+                    backend.submit(packet['frame'], packet['timestamp'])
+                
+                for timestamp, frame, face_locations, face_encodings in backend.collect(timeout=0.01):
+                    if not self.detection_enabled:
+                        continue
+                    faces = self.recognize_faces(frame, face_locations, face_encodings)
+                    self.latest_detections = (time.time(), faces)
+                    self.stage_stats['detect'].record(time.time() - timestamp)
+            except Exception as e:
+                print(f"Detection error: {e}")
         
-        return frame
+        backend.close()
+        self.detection_backend = None
+        print("Detection worker thread ended")
     
-    def log_detection(self, person_name, is_authorized, confidence):
-        """Log a detection event with video and photo capture"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        person_type = "authorized" if is_authorized else "unauthorized"
-        
-        detection_data = {
-            'person_type': person_type,
-            'person_name': person_name,
-            'confidence': confidence,
-            'timestamp': timestamp,
-            'source': 'webcam'
-        }
-        
-        # If unauthorized detection, capture video and photo evidence
-        video_path = None
-        photo_path = None
-        summary_path = None
+    def render_worker(self):
+        """Render thread: draws the latest face boxes and converts frames for display"""
+        last_report = time.time()
         
-        if not is_authorized and self.current_frame is not None:
-            print("🎥 Capturing evidence for unauthorized detection...")
-            
-            # Create evidence directories only when needed
-            clips_dir = "security_clips"
-            logs_dir = "security_logs"
-            photos_dir = "security_photos"
-            
-            os.makedirs(clips_dir, exist_ok=True)
-            os.makedirs(logs_dir, exist_ok=True)
-            os.makedirs(photos_dir, exist_ok=True)
-            
-            # Capture detection photo
-            photo_path = self.capture_detection_photo(detection_data, photos_dir)
-            
-            # Capture video clip
-            video_path = self.capture_detection_video(detection_data, clips_dir)
+        while self.is_streaming:
+            packet = self.render_queue.get(timeout=0.5)
+            if packet is None:
+                continue
             
-            # Create summary report
-            summary_path = self.create_detection_summary(detection_data, logs_dir, photo_path, video_path)
-            
-            # Update detection data with file paths
-            detection_data.update({
-                'evidence': {
-                    'photo_path': photo_path,
-                    'video_path': video_path,
-                    'summary_path': summary_path
-                }
-            })
+            try:
+                # Convert frame to display format (a new array, so drawing never touches the captured frame)
+                frame_rgb = cv2.cvtColor(packet['frame'], cv2.COLOR_BGR2RGB)
+                
+                detected_at, faces = self.latest_detections
+                if self.detection_enabled and time.time() - detected_at < self.overlay_seconds:
+                    self.draw_detections(frame_rgb, faces, rgb=True)
+                
+                image = Image.fromarray(frame_rgb)
+                
+                # Resize to fit display (the camera is usually already 640x480)
+                if image.size != (640, 480):
+                    image = image.resize((640, 480), Image.Resampling.LANCZOS)
+                
+                # Only the newest frame is kept; the GUI thread converts and shows it in display_frame
+                self.frame_slot.put({'image': image, 'timestamp': packet['timestamp']})
+                self.stage_stats['render'].record(time.time() - packet['timestamp'])
+                
+                if time.time() - last_report >= 2:
+                    self.message_queue.put(('pipeline_stats', self.pipeline_summary()))
+                    last_report = time.time()
+                
+            except Exception as e:
+                print(f"Render error: {e}")
         
-        self.message_queue.put(('detection', detection_data))
+        print("Render worker thread ended")
     
-    def capture_detection_photo(self, detection_data, photos_dir):
-        """Capture and save detection photo with overlay"""
-        try:
-            timestamp = datetime.now()
-            filename = f"detection_{timestamp.strftime('%Y%m%d_%H%M%S')}_{int(detection_data.get('confidence', 0)*100)}.jpg"
-            photo_path = os.path.join(photos_dir, filename)
-            
-            # Create photo with detection overlay
-            overlay_frame = self.add_detection_overlay(self.current_frame, detection_data, timestamp)
-            
-            # Save photo
-            cv2.imwrite(photo_path, overlay_frame)
-            
-            # Get file size
-            file_size = os.path.getsize(photo_path)
-            print(f"📸 Detection photo saved: {filename} ({file_size/1024:.1f}KB)")
-            
-            return photo_path
-            
-        except Exception as e:
-            print(f"❌ Error capturing detection photo: {e}")
-            return None
+    def pipeline_summary(self):
+        """Stage latencies and dropped frame counts for the status line"""
+        parts = [stats.summary() for stats in self.stage_stats.values()]
+        parts.append(f"dropped: detect {self.detection_queue.dropped}, render {self.render_queue.dropped}, "
+                     f"display {self.frame_slot.dropped}")
+        return " | ".join(parts)
     
-    def capture_detection_video(self, detection_data, clips_dir):
-        """Capture video clip from buffer and post-detection frames"""
-        try:
-            timestamp = datetime.now()
-            filename = f"detection_{timestamp.strftime('%Y%m%d_%H%M%S')}_{int(detection_data.get('confidence', 0)*100)}.mp4"
-            video_path = os.path.join(clips_dir, filename)
-            
-            if not self.current_frame.any():
-                return None
-            
-            # Get frame dimensions
-            height, width = self.current_frame.shape[:2]
-            
-            # Create video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            video_writer = cv2.VideoWriter(video_path, fourcc, self.recording_fps, (width, height))
-            
-            print(f"📹 Creating detection video: {filename}")
-            
-            # Write buffered frames (pre-detection)
-            frames_written = 0
-            for frame_data in self.video_buffer:
-                video_writer.write(frame_data['frame'])
-                frames_written += 1
-            
-            # Add highlighted detection frame
-            highlighted_frame = self.add_detection_overlay(self.current_frame, detection_data, timestamp)
-            video_writer.write(highlighted_frame)
-            frames_written += 1
-            
-            # Continue with highlighted frame for a few more seconds
-            post_detection_frames = (self.clip_duration - self.buffer_seconds) * self.recording_fps
-            for _ in range(int(post_detection_frames)):
-                video_writer.write(highlighted_frame)
-                frames_written += 1
-            
-            video_writer.release()
-            
-            # Get file size
-            file_size = os.path.getsize(video_path)
-            print(f"✅ Video clip created: {frames_written} frames, {file_size/1024/1024:.1f}MB")
-            
-            # Update detection data with video info
-            detection_data.update({
-                'video_clip': {
-                    'filename': filename,
-                    'path': video_path,
-                    'duration_seconds': frames_written / self.recording_fps,
-                    'file_size_mb': file_size / 1024 / 1024,
-                    'frame_count': frames_written
-                }
+    def recognize_faces(self, frame, face_locations, face_encodings):
+        """
+        Match detected faces against the enrolled identities and log the detection
+        
+        Args:
+            frame: The captured frame the faces were detected in (evidence is taken from this frame)
+        
+        Returns:
+            List of detected faces (box in full-frame coordinates, name, authorization, confidence)
+        """
+        # Compare every face in the frame with the enrolled identities in one pass
+        matches = self.identity_store.match(face_encodings)
+        scale = int(round(1 / self.detection_scale))
+        
+        faces = []
+        for (top, right, bottom, left), match in zip(face_locations, matches):
+            # Scale back up face locations since the frame was downscaled for detection
+            is_authorized = match.name != "Unknown"
+            faces.append({
+                'box': (top * scale, right * scale, bottom * scale, left * scale),
+                'name': match.name,
+                'is_authorized': is_authorized,
+                'confidence': match.confidence
             })
-            
-            return video_path
-            
-        except Exception as e:
-            print(f"❌ Error creating video clip: {e}")
-            return None
-    
-    def add_detection_overlay(self, frame, detection_data, timestamp):
-        """Add visual overlay to detection frame"""
-        if frame is None:
-            return None
-            
-        overlay_frame = frame.copy()
-        
-        # Add red border for unauthorized detection
-        border_color = (0, 0, 255)  # Red for unauthorized
-        border_thickness = 8
-        cv2.rectangle(overlay_frame, (0, 0), 
-                     (frame.shape[1]-1, frame.shape[0]-1), 
-                     border_color, border_thickness)
-        
-        # Add detection information
-        person_name = detection_data.get('person_name', 'Unknown')
-        confidence = detection_data.get('confidence', 0)
-        timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Main detection text
-        main_text = f"UNAUTHORIZED: {person_name}"
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 1.0
-        text_thickness = 2
-        
-        # Get text size for background
-        (text_width, text_height), _ = cv2.getTextSize(main_text, font, font_scale, text_thickness)
-        
-        # Add semi-transparent background
-        overlay = overlay_frame.copy()
-        cv2.rectangle(overlay, (10, 10), (text_width + 30, text_height + 80), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.7, overlay_frame, 0.3, 0, overlay_frame)
-        
-        # Add main text
-        cv2.putText(overlay_frame, main_text, (20, 35), 
-                   font, font_scale, (0, 0, 255), text_thickness)
-        
-        # Add confidence score
-        confidence_text = f"Confidence: {confidence:.2f}"
-        cv2.putText(overlay_frame, confidence_text, (20, 60), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-        
-        # Add timestamp
-        cv2.putText(overlay_frame, timestamp_str, (20, 80), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-        
-        # Add timestamp at bottom of frame
-        bottom_text = f"Security Alert - {timestamp_str}"
-        cv2.putText(overlay_frame, bottom_text, 
-                   (20, frame.shape[0] - 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-        
-        return overlay_frame
+        
+        # Log detection with the frame the faces were found in; current_frame has moved on by now
+        self.detection_logger.log_matches(matches, frame)
+        
+        return faces
     
-    def create_detection_summary(self, detection_data, logs_dir, photo_path, video_path):
-        """Create a text summary file for the detection"""
-        try:
-            timestamp = datetime.now()
-            summary_filename = f"detection_summary_{timestamp.strftime('%Y%m%d_%H%M%S')}.txt"
-            summary_path = os.path.join(logs_dir, summary_filename)
+    def draw_detections(self, frame, faces, rgb=False):
+        """Draw face boxes and labels onto a frame in place"""
+        for face in faces:
+            top, right, bottom, left = face['box']
+            is_authorized = face['is_authorized']
             
-            with open(summary_path, 'w') as f:
-                f.write("SECURITY SYSTEM DETECTION REPORT\n")
-                f.write("=" * 40 + "\n\n")
-                f.write(f"Detection Time: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Person Type: {detection_data.get('person_type', 'Unknown')}\n")
-                f.write(f"Person Name: {detection_data.get('person_name', 'Unknown')}\n")
-                f.write(f"Confidence: {detection_data.get('confidence', 0):.2f}\n")
-                f.write(f"Source: {detection_data.get('source', 'Unknown')}\n")
-                f.write(f"Device: unified_security_system\n")
-                
-                f.write(f"\nEvidence Files:\n")
-                if photo_path:
-                    f.write(f"  Detection Photo: {os.path.basename(photo_path)}\n")
-                if video_path:
-                    f.write(f"  Video Clip: {os.path.basename(video_path)}\n")
-                
-                if 'video_clip' in detection_data:
-                    video_info = detection_data['video_clip']
-                    f.write(f"\nVideo Clip Information:\n")
-                    f.write(f"  Duration: {video_info.get('duration_seconds', 0):.1f} seconds\n")
-                    f.write(f"  File Size: {video_info.get('file_size_mb', 0):.1f} MB\n")
-                    f.write(f"  Frame Count: {video_info.get('frame_count', 0)}\n")
-                
-                f.write(f"\nSystem Configuration:\n")
-                f.write(f"  Video Buffer: {self.buffer_seconds} seconds\n")
-                f.write(f"  Total Clip Duration: {self.clip_duration} seconds\n")
-                f.write(f"  Recording FPS: {self.recording_fps}\n")
-                f.write(f"  Detection Cooldown: {self.detection_cooldown} seconds\n")
-                
-            return summary_path
+            # Draw rectangle and label
+            color = (0, 255, 0) if is_authorized else (0, 0, 255)
+            if rgb:
+                color = color[::-1]
+            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
             
-        except Exception as e:
-            print(f"Error creating summary: {e}")
-            return None
+            label = f"{face['name']} ({'Authorized' if is_authorized else 'Unauthorized'})"
+            cv2.putText(frame, label, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
     
     def capture_for_training(self):
         """Capture current frame for training"""
@@ -1083,10 +1053,10 @@ Instructions for Jetson setup:
         
         cv2.imwrite(filepath, self.current_frame)
         
-        # Reload faces
-        self.reload_faces()
+        # Encode just this image; the faces list updates when it is done
+        self.enroll_face_file(filename)
         
-        messagebox.showinfo("Success", f"Captured and saved face for {name}")
+        self.status_var.set(f"Captured face for {name}, encoding...")
     
     def add_authorized_face(self):
         """Add authorized face from file"""
@@ -1105,8 +1075,8 @@ Instructions for Jetson setup:
                 new_filepath = os.path.join(self.authorized_faces_dir, new_filename)
                 shutil.copy2(filename, new_filepath)
                 
-                self.reload_faces()
-                messagebox.showinfo("Success", f"Added {name} to authorized faces")
+                self.enroll_face_file(new_filename)
+                self.status_var.set(f"Adding {name} to authorized faces...")
     
     def remove_authorized_face(self):
         """Remove selected authorized face"""
@@ -1118,29 +1088,39 @@ Instructions for Jetson setup:
             messagebox.showwarning("Warning", "Please select a face to remove")
             return
         
-        face_name = self.faces_listbox.get(selection[0])
+        face_name = self.faces_list_names[selection[0]]
         
-        # Find and remove file
+        # Remove every photo of this person
+        removed_files = []
         for filename in os.listdir(self.authorized_faces_dir):
-            if filename.startswith(face_name):
+            if filename.lower().endswith(('.png', '.jpg', '.jpeg')) and name_from_filename(filename) == face_name:
                 os.remove(os.path.join(self.authorized_faces_dir, filename))
-                break
+                removed_files.append(filename)
+        
+        # Only the affected rows are dropped from the gallery
+        def change():
+            self.face_cache.remove_files(removed_files)
+            return f"Removed {face_name}"
         
-        self.reload_faces()
-        messagebox.showinfo("Success", f"Removed {face_name}")
+        self.update_gallery(change)
     
     def reload_faces(self):
         """Reload authorized faces"""
         if FACE_RECOGNITION_AVAILABLE:
-            self.load_known_faces()
-            self.update_faces_list()
+            def change():
+                self.face_cache.sync(encode_face_image, name_from_filename)
+                return "Authorized faces reloaded"
+            
+            self.update_gallery(change)
     
     def update_faces_list(self):
         """Update the faces listbox"""
         if hasattr(self, 'faces_listbox'):
             self.faces_listbox.delete(0, tk.END)
-            for name in self.known_face_names:
-                self.faces_listbox.insert(tk.END, name)
+            self.faces_list_names = []
+            for name, photo_count in self.identity_store.identities():
+                self.faces_list_names.append(name)
+                self.faces_listbox.insert(tk.END, f"{name} ({photo_count} photo{'s' if photo_count != 1 else ''})")
     
     def test_detection(self):
         """Test detection functionality (Jetson mode)"""
@@ -1155,62 +1135,47 @@ Instructions for Jetson setup:
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'source': 'jetson'
         }
-        self.message_queue.put(('detection', data))
+        self.event_core.submit('detection', data)
     
     def start_server(self):
         """Start HTTP server to receive Jetson Nano signals"""
-        class SignalHandler(BaseHTTPRequestHandler):
-            def __init__(self, *args, app_instance=None, **kwargs):
-                self.app = app_instance
-                super().__init__(*args, **kwargs)
-            
-            def do_POST(self):
-                content_length = int(self.headers['Content-Length'])
-                post_data = self.rfile.read(content_length)
-                
-                try:
-                    data = json.loads(post_data.decode('utf-8'))
-                    data['source'] = 'jetson'  # Mark as Jetson source
-                    self.app.message_queue.put(('detection', data))
-                    
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"status": "received"}).encode())
-                    
-                except Exception as e:
-                    self.send_response(400)
-                    self.end_headers()
-                    print(f"Error processing request: {e}")
-            
-            def log_message(self, format, *args):
-                pass  # Suppress server logs
+        def accept_detection(data):
+            data['source'] = 'jetson'  # Mark as Jetson source
+            return self.event_core.submit('detection', data)
         
-        def create_handler():
-            def handler(*args, **kwargs):
-                SignalHandler(*args, app_instance=self, **kwargs)
-            return handler
+        def accept_detections(detections):
+            for data in detections:
+                data['source'] = 'jetson'
+            return self.event_core.submit_batch(detections)  # Takes what fits under the queue limit
         
         try:
             port = int(self.port_var.get())
-            self.server = HTTPServer(('localhost', port), create_handler())
-            self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
-            self.server_thread.start()
+            self.server = IngestServer(('localhost', port), accept_detection, self.event_core.saturated,
+                                       max_workers=self.ingest_workers, max_body=self.ingest_max_body,
+                                       on_batch=accept_detections).start()
             print(f"Server listening on http://localhost:{port}")
         except Exception as e:
             messagebox.showerror("Server Error", f"Could not start server: {e}")
     
     def process_messages(self):
-        """Process messages from worker threads"""
+        """Render the updates posted by the event core and the worker threads"""
         try:
             while True:
                 message_type, data = self.message_queue.get_nowait()
                 
-                if message_type == 'detection':
-                    self.handle_detection(data)
-                elif message_type == 'video_frame':
-                    self.video_label.config(image=data)
-                    self.video_label.image = data  # Keep reference
+                if message_type == 'detection_view':
+                    self.show_detection(data)
+                elif message_type == 'status':
+                    self.status_var.set(data)
+                elif message_type == 'email_status':
+                    self.status_var.set(data)
+                    self.email_status_var.set(data)
+                elif message_type == 'faces_updated':
+                    self.update_faces_list()
+                    self.status_var.set(data)
+                elif message_type == 'pipeline_stats':
+                    if self.is_streaming:
+                        self.pipeline_stats_var.set(data)
                     
         except queue.Empty:
             pass
@@ -1218,13 +1183,23 @@ Instructions for Jetson setup:
         # Schedule next check
         self.root.after(100, self.process_messages)
     
-    def handle_detection(self, data):
-        """Handle detection event from Jetson Nano or webcam"""
-        timestamp = data.get('timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        person_type = data.get('person_type', 'unknown')
-        person_name = data.get('person_name', 'Unknown Person')
-        confidence = data.get('confidence', 0)
-        source = data.get('source', 'unknown')
+    def display_frame(self):
+        """Show the newest rendered webcam frame, if a new one arrived, then reschedule"""
+        packet = self.frame_slot.take()
+        if packet is not None and self.is_streaming:
+            try:
+                photo = ImageTk.PhotoImage(packet['image'])
+                self.video_label.config(image=photo)
+                self.video_label.image = photo  # Keep reference
+                self.stage_stats['display'].record(time.time() - packet['timestamp'])
+            except Exception as e:
+                print(f"Display error: {e}")
+        
+        self.root.after(self.display_interval_ms, self.display_frame)
+    
+    def show_detection(self, view):
+        """Show a processed detection (published by the event core) in the status label and logs view"""
+        person_type, person_name, source = view['person_type'], view['person_name'], view['source']
         
         # Update detection status
         if person_type == 'authorized':
@@ -1238,297 +1213,100 @@ Instructions for Jetson setup:
             else:
                 self.detection_status.config(text="⚠ Unauthorized Person", background="red")
         
-        # Log the event
-        source_label = "WEBCAM" if source == 'webcam' else "JETSON"
-        if source == 'webcam':
-            log_entry = f"[{timestamp}] [{source_label}] {person_type.title()}: {person_name} (confidence: {confidence:.2f})"
-        else:
-            log_entry = f"[{timestamp}] [{source_label}] {person_type.title()} person detected (confidence: {confidence:.2f})"
-        
-        self.logs_text.insert(tk.END, log_entry + "\n")
+        self.logs_text.insert(tk.END, view['log_entry'] + "\n")
         self.logs_text.see(tk.END)
         
-        # Store in local logs
-        self.store_detection_log(timestamp, person_type, confidence, source, person_name)
-        
-        # Send notification
-        self.send_notification(person_type, timestamp, person_name, source)
-        
         # Reset status after 3 seconds
         self.root.after(3000, lambda: self.detection_status.config(
             text="No Detection" if source == 'jetson' else "Detection: ON", 
             background="gray" if source == 'jetson' else ("green" if self.detection_enabled else "gray")))
     
-    def store_detection_log(self, timestamp, person_type, confidence, source, person_name="Unknown"):
-        """Store detection event in local log file"""
-        try:
-            log_data = {
-                'timestamp': timestamp,
-                'person_type': person_type,
-                'person_name': person_name,
-                'confidence': confidence,
-                'source': source,
-                'device_id': 'unified_security_system'
-            }
-            
-            # Append to local log file
-            with open('detection_logs.json', 'a') as f:
-                f.write(json.dumps(log_data) + '\n')
-            
-            print(f"Local Log: {timestamp} - {person_type} ({person_name}) from {source} ({confidence})")
-            
-        except Exception as e:
-            print(f"Error storing log: {e}")
-    
-    def send_notification(self, person_type, timestamp, person_name="Unknown", source="unknown"):
-        """Send email notification with photo and video attachments"""
-        # Check notification settings
-        if person_type == 'authorized' and not self.notify_authorized.get():
-            return
-        if person_type == 'unauthorized' and not self.notify_unauthorized.get():
-            return
-        
-        try:
-            if person_type == 'authorized':
-                title = "Authorized Access"
-                if source == 'webcam':
-                    body = f"{person_name} detected via webcam at {timestamp}"
-                else:
-                    body = f"Authorized person detected via Jetson Nano at {timestamp}"
-            else:
-                title = "Security Alert"
-                if source == 'webcam':
-                    body = f"Unauthorized person ({person_name}) detected via webcam at {timestamp}"
-                else:
-                    body = f"Unauthorized person detected via Jetson Nano at {timestamp}"
-            
-            # Send email notification with attachments for unauthorized detections
-            self.send_email_notification(title, body, person_type)
-            
-            # Demo mode
-            print(f"Email sent: {title} - {body}")
-            self.status_var.set(f"Email sent: {title}")
-            
-        except Exception as e:
-            print(f"Error sending notification: {e}")
-    
-    def send_email_notification(self, subject, body, alert_type):
-        """Send email notification with evidence attachments"""
+    def sync_event_settings(self, *args):
+        """Copy the notification and email settings from the GUI to the event core"""
         try:
-            # Use hardcoded sender credentials (user can't see these)
-            smtp_server = self.smtp_server_var.get()
             smtp_port = int(self.smtp_port_var.get())
-            sender_email = self.sender_email_var.get()
-            sender_password = self.sender_password_var.get()
-            recipient_email = self.recipient_email_var.get()
-            
-            if not recipient_email.strip():
-                raise Exception("No recipient email configured. Please set your email address in Settings.")
-            
-            # Validate hardcoded credentials
-            if sender_email == "your-security-system@gmail.com" or sender_password == "your-app-password-here":
-                raise Exception("Email system not configured properly. Please contact the system administrator.")
-            
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = f"Smart Security System <{sender_email}>"
-            msg['To'] = recipient_email
-            msg['Subject'] = f"🛡️ Security Alert: {subject}"
-            
-            # Find latest evidence files for unauthorized detections
-            photo_path = None
-            video_path = None
-            summary_path = None
-            
-            if alert_type == "unauthorized":
-                # Look for the most recent evidence files
-                photo_path = self.find_latest_evidence_file("security_photos", ".jpg")
-                video_path = self.find_latest_evidence_file("security_clips", ".mp4")
-                summary_path = self.find_latest_evidence_file("security_logs", ".txt")
-            
-            # Enhanced HTML email body
-            if alert_type == "test":
-                html_body = f"""
-                <html>
-                <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                    <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
-                        <h2 style="color: #2196F3; text-align: center;">
-                            🛡️ Smart Security System - Test Email
-                        </h2>
-                        <div style="background: #f0f8ff; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                            <p><strong>✅ Email Configuration Test</strong></p>
-                            <p>{body}</p>
-                        </div>
-                        <hr style="border: 1px solid #eee; margin: 20px 0;">
-                        <p style="font-size: 12px; color: #666; text-align: center;">
-                            This is an automated test message from your Smart Security System.<br>
-                            If you received this, your email notifications are working correctly!
-                        </p>
-                    </div>
-                </body>
-                </html>
-                """
-            else:
-                # Real security alert with evidence
-                evidence_section = ""
-                if photo_path or video_path or summary_path:
-                    evidence_section = """
-                    <div style="background: #fff3cd; padding: 15px; border-radius: 5px; margin: 20px 0; border-left: 4px solid #ffc107;">
-                        <p><strong>📋 Evidence Attached:</strong></p>
-                        <ul>
-                    """
-                    if photo_path:
-                        evidence_section += f"<li>📸 Detection Photo: {os.path.basename(photo_path)}</li>"
-                    if video_path:
-                        evidence_section += f"<li>📹 Video Clip: {os.path.basename(video_path)}</li>"
-                    if summary_path:
-                        evidence_section += f"<li>📄 Detailed Report: {os.path.basename(summary_path)}</li>"
-                    evidence_section += """
-                        </ul>
-                    </div>
-                    """
-                
-                alert_color = "#4CAF50" if alert_type == "authorized" else "#f44336"
-                html_body = f"""
-                <html>
-                <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                    <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
-                        <h2 style="color: {alert_color}; text-align: center;">
-                            🛡️ SECURITY ALERT
-                        </h2>
-                        <div style="background: {'#e8f5e8' if alert_type == 'authorized' else '#ffebee'}; padding: 15px; border-radius: 5px; margin: 20px 0; border-left: 4px solid {alert_color};">
-                            <p><strong>Alert Type:</strong> {subject}</p>
-                            <p><strong>Details:</strong> {body}</p>
-                            <p><strong>Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                            <p><strong>Status:</strong> <span style="color: {alert_color}; font-weight: bold;">{alert_type.upper()}</span></p>
-                        </div>
-                        
-                        {evidence_section}
-                        
-                        <div style="background: #f8f9fa; padding: 10px; border-radius: 5px; margin: 20px 0;">
-                            <p><strong>⚠️ Next Steps:</strong></p>
-                            <ul>
-                                <li>Review attached evidence carefully</li>
-                                <li>Verify if this was authorized access</li>
-                                <li>Contact security personnel if needed</li>
-                                <li>Evidence files are stored locally and auto-deleted after 7 days</li>
-                            </ul>
-                        </div>
-                        
-                        <hr style="border: 1px solid #eee; margin: 20px 0;">
-                        <p style="font-size: 12px; color: #666; text-align: center;">
-                            This is an automated security alert from your Smart Security System.<br>
-                            Evidence files are automatically cleaned up after 7 days for privacy.
-                        </p>
-                    </div>
-                </body>
-                </html>
-                """
-            
-            msg.attach(MIMEText(html_body, 'html'))
-            
-            # Attach evidence files for unauthorized detections
-            if alert_type == "unauthorized":
-                # Attach detection photo
-                if photo_path and os.path.exists(photo_path):
-                    try:
-                        with open(photo_path, "rb") as f:
-                            img_data = f.read()
-                        image = MIMEImage(img_data)
-                        image.add_header('Content-Disposition', f'attachment; filename={os.path.basename(photo_path)}')
-                        msg.attach(image)
-                        print(f"📎 Photo attached: {os.path.basename(photo_path)}")
-                    except Exception as e:
-                        print(f"⚠️ Could not attach photo: {e}")
-                
-                # Attach video file
-                if video_path and os.path.exists(video_path):
-                    try:
-                        with open(video_path, "rb") as attachment:
-                            part = MIMEBase('application', 'octet-stream')
-                            part.set_payload(attachment.read())
-                        
-                        encoders.encode_base64(part)
-                        part.add_header('Content-Disposition', f'attachment; filename={os.path.basename(video_path)}')
-                        msg.attach(part)
-                        print(f"📎 Video attached: {os.path.basename(video_path)}")
-                    except Exception as e:
-                        print(f"⚠️ Could not attach video: {e}")
-                
-                # Attach summary report
-                if summary_path and os.path.exists(summary_path):
-                    try:
-                        with open(summary_path, "rb") as attachment:
-                            part = MIMEBase('application', 'octet-stream')
-                            part.set_payload(attachment.read())
-                        
-                        encoders.encode_base64(part)
-                        part.add_header('Content-Disposition', f'attachment; filename={os.path.basename(summary_path)}')
-                        msg.attach(part)
-                        print(f"📎 Report attached: {os.path.basename(summary_path)}")
-                    except Exception as e:
-                        print(f"⚠️ Could not attach report: {e}")
-            
-            # Send email
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                server.starttls()
-                server.login(sender_email, sender_password)
-                server.send_message(msg)
-            
-            print(f"📧 Email notification sent successfully to {recipient_email}")
-            
-        except Exception as e:
-            print(f"❌ Failed to send email: {e}")
-            self.status_var.set(f"Email failed: {str(e)[:50]}...")
+        except ValueError:
+            return
+        self.event_core.update_settings(
+            notify_authorized=self.notify_authorized.get(),
+            notify_unauthorized=self.notify_unauthorized.get(),
+            email={
+                'server': self.smtp_server_var.get(),
+                'port': smtp_port,
+                'sender': self.sender_email_var.get(),
+                'password': self.sender_password_var.get(),
+                'recipient': self.recipient_email_var.get(),
+                'require_tls': self.smtp_require_tls_var.get()
+            })
     
-    def find_latest_evidence_file(self, directory, extension):
-        """Find the most recent file in a directory with given extension"""
+    def sync_detection_cooldown(self, *args):
+        """Apply the cooldown entry as it is typed (partial input such as "" or "." is ignored)"""
         try:
-            if not os.path.exists(directory):
-                return None
-            
-            files = [f for f in os.listdir(directory) if f.endswith(extension)]
-            if not files:
-                return None
-            
-            # Sort by modification time, most recent first
-            files.sort(key=lambda x: os.path.getmtime(os.path.join(directory, x)), reverse=True)
-            return os.path.join(directory, files[0])
-            
-        except Exception as e:
-            print(f"Error finding latest evidence file: {e}")
-            return None
+            self.detection_logger.cooldown = float(self.cooldown_var.get())
+        except ValueError:
+            pass
     
     def refresh_logs(self):
-        """Refresh logs from local file"""
+        """Show the newest page of the local detection log"""
         try:
-            if os.path.exists('detection_logs.json'):
-                self.logs_text.delete(1.0, tk.END)
-                
-                with open('detection_logs.json', 'r') as f:
-                    lines = f.readlines()
-                    # Show last 100 entries
-                    for line in lines[-100:]:
-                        try:
-                            data = json.loads(line.strip())
-                            source_label = data.get('source', 'unknown').upper()
-                            person_name = data.get('person_name', 'Unknown')
-                            log_entry = f"[{data['timestamp']}] [{source_label}] {data['person_type'].title()}: {person_name} (confidence: {data.get('confidence', 0):.2f})"
-                            self.logs_text.insert(tk.END, log_entry + "\n")
-                        except json.JSONDecodeError:
-                            continue
-                            
+            records = None
+            if self.logs_page and self.logs_at_latest:
+                # Only read the entries logged since the last refresh
+                new_records = self.log_store.page_after(self.logs_page[-1]['id'], self.logs_page_size)
+                if len(new_records) < self.logs_page_size:
+                    records = (self.logs_page + new_records)[-self.logs_page_size:]
+            if records is None:
+                records = self.log_store.latest(self.logs_page_size)
+            
+            if records:
+                self.logs_at_latest = True
+                self.show_logs_page(records)
                 messagebox.showinfo("Logs Refreshed", "Local logs refreshed successfully!")
             else:
-                messagebox.showinfo("No Logs", "No log file found. Logs will be created when detections occur.")
+                messagebox.showinfo("No Logs", "No logs stored yet. Logs will be created when detections occur.")
                 
         except Exception as e:
             messagebox.showerror("Error", f"Could not refresh logs: {e}")
     
+    def older_logs(self):
+        """Show the page of log entries before the one displayed"""
+        if not self.logs_page:
+            return self.refresh_logs()
+        records = self.log_store.page_before(self.logs_page[0]['id'], self.logs_page_size)
+        if records:
+            self.logs_at_latest = False
+            self.show_logs_page(records)
+        else:
+            self.status_var.set("No older log entries")
+    
+    def newer_logs(self):
+        """Show the page of log entries after the one displayed"""
+        if not self.logs_page:
+            return self.refresh_logs()
+        records = self.log_store.page_after(self.logs_page[-1]['id'], self.logs_page_size)
+        if records:
+            self.logs_at_latest = len(records) < self.logs_page_size
+            self.show_logs_page(records)
+        else:
+            self.status_var.set("No newer log entries")
+    
+    def show_logs_page(self, records):
+        """Replace the logs display with one page of stored records"""
+        self.logs_page = records
+        self.logs_text.delete(1.0, tk.END)
+        for data in records:
+            source_label = (data.get('source') or 'unknown').upper()
+            person_name = data.get('person_name') or 'Unknown'
+            log_entry = f"[{data['timestamp']}] [{source_label}] {(data.get('person_type') or 'unknown').title()}: {person_name} (confidence: {data.get('confidence') or 0:.2f})"
+            self.logs_text.insert(tk.END, log_entry + "\n")
+        self.logs_text.see(tk.END)
+    
     def clear_logs(self):
         """Clear logs display"""
         if messagebox.askyesno("Confirm", "Clear all logs from display?"):
             self.logs_text.delete(1.0, tk.END)
+            self.logs_page = []
+            self.logs_at_latest = False
     
     def export_logs(self):
         """Export logs to file"""
@@ -1549,10 +1327,16 @@ Instructions for Jetson setup:
         try:
             # Update detection cooldown
             self.detection_cooldown = float(self.cooldown_var.get())
+            self.evidence_capture.detection_cooldown = self.detection_cooldown
+            self.detection_logger.cooldown = self.detection_cooldown
+            
+            # Update alert coalescing window
+            self.alert_window = float(self.alert_window_var.get())
+            self.alert_coalescer.window = self.alert_window
             
             # Restart server with new port if changed
             if self.server:
-                self.server.shutdown()
+                self.server.stop()
                 self.start_server()
             
             messagebox.showinfo("Settings", "Settings saved successfully!")